@@ -7,6 +7,7 @@ Uses Sentence-Transformers for state-of-the-art embeddings
 """
 
 import gc
+import hashlib
 import logging
 import os
 import re
@@ -14,9 +15,10 @@ import threading
 import time
 import traceback
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import dotenv
 import numpy as np
@@ -118,6 +120,24 @@ class Config:
     BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))
     MAX_BATCH_SIZE = 128
 
+    # Inference backend: "torch" (SentenceTransformer) or "onnx" (ONNX Runtime, INT8)
+    BACKEND = os.getenv("EMBEDDER_BACKEND", "torch").lower()
+    ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+    ONNX_CACHE_DIR = os.path.join(
+        os.getenv("HF_HOME", os.path.expanduser("~/.cache/huggingface")), "onnx"
+    )
+    ONNX_THREADS = int(os.getenv("ONNX_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+    # Multi-process encoding (torch backend), e.g. "cpu,cpu,cpu,cpu" or "cuda:0,cuda:1"
+    POOL_DEVICES = [d.strip() for d in os.getenv("EMBED_POOL_DEVICES", "").split(",") if d.strip()]
+    POOL_THRESHOLD = int(os.getenv("EMBED_POOL_THRESHOLD", "64"))
+
+    # Half-precision weights on CUDA (no effect on CPU)
+    HALF_PRECISION = os.getenv("HALF_PRECISION", "true").lower() == "true"
+
+    # Embedding cache (entries, keyed on text hash; 0 disables)
+    EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if DEBUG else "INFO")
 
@@ -363,12 +383,104 @@ class ContentEmbedResponse:
     dimension: int
 
 
+# --- ONNX Runtime backend ---
+def _export_onnx(model_name: str, quant: bool = True) -> str:
+    """Export model to ONNX once (optionally INT8-quantized), return the .onnx path"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    export_dir = os.path.join(Config.ONNX_CACHE_DIR, model_name.replace("/", "__"))
+    file_name = "model_quantized.onnx" if quant else "model.onnx"
+    onnx_path = os.path.join(export_dir, file_name)
+
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    log.info(f"📦 Exporting {model_name} to ONNX: {export_dir}")
+    ort_model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    ort_model.save_pretrained(export_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    if quant:
+        log.info("⚙️  Quantizing ONNX model (dynamic INT8, AVX512-VNNI)")
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=export_dir, quantization_config=qconfig)
+
+    return onnx_path
+
+
+class OnnxSentenceEncoder:
+    """ONNX Runtime encoder exposing the subset of SentenceTransformer.encode we use"""
+
+    def __init__(self, model_name: str, quant: bool = True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        onnx_path = _export_onnx(model_name, quant=quant)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = Config.ONNX_THREADS
+
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(onnx_path))
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_seq_length = Config.MAX_TOKENS
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Sort by length so each batch pads to a similar size (as SentenceTransformer does)
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        sorted_sentences = [sentences[i] for i in order]
+
+        outputs = []
+        for start in range(0, len(sorted_sentences), batch_size):
+            features = self.tokenizer(
+                sorted_sentences[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over non-padding tokens
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+
+        sorted_embeddings = np.concatenate(outputs, axis=0)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings[0] if single else embeddings
+
+
 # --- Model Manager ---
 class ModelManager:
     """Singleton model manager with lazy loading"""
 
     _instance: Optional["ModelManager"] = None
-    _model: Optional[SentenceTransformer] = None
+    _model: Optional[Union[SentenceTransformer, OnnxSentenceEncoder]] = None
+    _pool: Optional[Dict[str, Any]] = None
     _loading: bool = False
 
     def __new__(cls):
@@ -376,7 +488,7 @@ class ModelManager:
             cls._instance = super(ModelManager, cls).__new__(cls)
         return cls._instance
 
-    def load_model(self) -> SentenceTransformer:
+    def load_model(self) -> Union[SentenceTransformer, OnnxSentenceEncoder]:
         """Load model with exponential backoff on failure"""
         if self._model is not None:
             return self._model
@@ -389,13 +501,18 @@ class ModelManager:
         self._loading = True
 
         try:
-            log.info(f"📦 Loading model: {Config.MODEL_NAME}")
+            log.info(f"📦 Loading model: {Config.MODEL_NAME} (backend={Config.BACKEND})")
 
             # Track memory before loading
             mem_before = psutil.Process().memory_info().rss
 
             start = time.time()
-            self._model = SentenceTransformer(Config.MODEL_NAME)
+            if Config.BACKEND == "onnx":
+                self._model = OnnxSentenceEncoder(Config.MODEL_NAME, quant=Config.ONNX_QUANTIZE)
+            else:
+                self._model = SentenceTransformer(Config.MODEL_NAME)
+                if Config.HALF_PRECISION and torch.cuda.is_available():
+                    self._model.half()
             self._model.max_seq_length = Config.MAX_TOKENS
             elapsed = time.time() - start
 
@@ -418,6 +535,8 @@ class ModelManager:
             _ = self._model.encode(["warmup text", "another warmup"], show_progress_bar=False)
             log.info(f"✅ Model warmed up in {time.time() - warmup_start:.2f}s")
 
+            self._start_pool()
+
             return self._model
 
         except Exception as e:
@@ -428,17 +547,86 @@ class ModelManager:
             self._loading = False
 
     @property
-    def model(self) -> SentenceTransformer:
+    def model(self) -> Union[SentenceTransformer, OnnxSentenceEncoder]:
         """Get loaded model"""
         if self._model is None:
             return self.load_model()
         return self._model
 
+    def _start_pool(self):
+        """Start multi-process encode pool if devices are configured"""
+        devices = Config.POOL_DEVICES
+        if not devices and torch.cuda.device_count() > 1:
+            devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+
+        if len(devices) < 2 or not isinstance(self._model, SentenceTransformer):
+            return
+
+        log.info(f"🧵 Starting encode pool on {devices}")
+        self._pool = self._model.start_multi_process_pool(target_devices=devices)
+
+    @property
+    def pool(self) -> Optional[Dict[str, Any]]:
+        """Get multi-process pool (None when disabled)"""
+        return self._pool
+
+    def close(self):
+        """Stop the multi-process pool"""
+        if self._pool is not None:
+            SentenceTransformer.stop_multi_process_pool(self._pool)
+            self._pool = None
+
 
 # Global model manager
 model_manager = ModelManager()
 
 
+# --- Embedding Cache ---
+class EmbeddingCache:
+    """Thread-safe LRU of normalized embeddings keyed on a hash of the input text"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        if self.max_size <= 0:
+            return None
+        key = self._key(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+        if embedding is None:
+            cache_misses.inc()
+        else:
+            cache_hits.inc()
+        return embedding
+
+    def put(self, text: str, embedding: np.ndarray):
+        if self.max_size <= 0:
+            return
+        # Copy so a cached row does not keep the whole batch matrix alive
+        value = np.array(embedding, dtype=np.float32)
+        key = self._key(text)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+embedding_cache = EmbeddingCache(Config.EMBED_CACHE_SIZE)
+
+
 # --- Embedding Functions ---
 def estimate_token_count(text: str) -> int:
     """Rough token count estimation (4 chars ≈ 1 token)"""
@@ -480,6 +668,26 @@ def embed_single(text: str) -> tuple[List[float], int]:
     return embedding.tolist(), token_count
 
 
+def _encode_normalized(texts: List[str]) -> np.ndarray:
+    """Encode texts to L2-normalized embeddings (multi-process pool for large batches)"""
+    model = model_manager.model
+    pool = model_manager.pool
+
+    if pool is not None and len(texts) >= Config.POOL_THRESHOLD:
+        embeddings = model.encode_multi_process(texts, pool, batch_size=Config.BATCH_SIZE)
+        # encode_multi_process has no normalize flag in this version; L2 normalize here
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    return model.encode(
+        texts,
+        batch_size=Config.BATCH_SIZE,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,  # L2 normalize
+    )
+
+
 def embed_batch(texts: List[str]) -> tuple[List[List[float]], List[int]]:
     """Embed batch of texts efficiently with metrics"""
     if not texts:
@@ -496,19 +704,20 @@ def embed_batch(texts: List[str]) -> tuple[List[List[float]], List[int]]:
         # All texts empty
         return [[0.0] * Config.EMBEDDING_DIM] * len(texts), [0] * len(texts)
 
-    model = model_manager.model
+    # Serve repeated texts from cache; only encode the misses
+    embeddings = [embedding_cache.get(t) for t in non_empty_texts]
+    miss_positions = [k for k, emb in enumerate(embeddings) if emb is None]
 
     # Track memory
     gc.collect()
     mem_before = psutil.Process().memory_info().rss
 
-    embeddings = model.encode(
-        non_empty_texts,
-        batch_size=Config.BATCH_SIZE,
-        show_progress_bar=False,
-        convert_to_numpy=True,
-        normalize_embeddings=True,  # L2 normalize
-    )
+    if miss_positions:
+        miss_texts = [non_empty_texts[k] for k in miss_positions]
+        encoded = _encode_normalized(miss_texts)
+        for k, emb in zip(miss_positions, encoded):
+            embeddings[k] = emb
+            embedding_cache.put(non_empty_texts[k], emb)
 
     mem_after = psutil.Process().memory_info().rss
     mem_delta = mem_after - mem_before
@@ -518,21 +727,15 @@ def embed_batch(texts: List[str]) -> tuple[List[List[float]], List[int]]:
             f"High batch memory: {mem_delta / 1024 / 1024:.2f}MB " f"for {len(texts)} texts"
         )
 
-    # Reconstruct full results
-    full_embeddings: List[List[float]] = []
-    full_token_counts: List[int] = []
+    # Scatter into a zero-filled FP32 matrix (empty inputs keep zero vectors)
+    full_embeddings = np.zeros((len(texts), Config.EMBEDDING_DIM), dtype=np.float32)
+    full_embeddings[np.asarray(non_empty_indices, dtype=np.intp)] = np.stack(embeddings)
 
-    j = 0
-    for i, text in enumerate(texts):
-        if i in non_empty_indices:
-            full_embeddings.append(embeddings[j].tolist())
-            full_token_counts.append(estimate_token_count(text))
-            j += 1
-        else:
-            full_embeddings.append([0.0] * Config.EMBEDDING_DIM)
-            full_token_counts.append(0)
+    full_token_counts = [0] * len(texts)
+    for i in non_empty_indices:
+        full_token_counts[i] = estimate_token_count(texts[i])
 
-    return full_embeddings, full_token_counts
+    return full_embeddings.tolist(), full_token_counts
 
 
 def scale_embedding(embedding: List[float], weight: float) -> List[float]:
@@ -540,23 +743,25 @@ def scale_embedding(embedding: List[float], weight: float) -> List[float]:
     return [val * weight for val in embedding]
 
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Per-type boilerplate (CODE has none: newlines are already collapsed by whitespace pass)
+_TYPE_NOISE_RE: Dict[ContentType, "re.Pattern[str]"] = {
+    ContentType.PUBLICATION: re.compile(r"(?i)(download|view)\s+(pdf|paper|full text)"),
+    ContentType.BIOGRAPHY: re.compile(r"(?i)(curriculum vitae|download cv)"),
+}
+
+
 def preprocess_by_type(text: str, content_type: ContentType) -> str:
     """Clean text based on content type"""
-    # Remove excessive whitespace
-    text = re.sub(r"\s+", " ", text)
+    # Remove excessive whitespace (skip the regex scan when already single-spaced)
+    if "  " in text or not text.isprintable():
+        text = _WHITESPACE_RE.sub(" ", text)
     text = text.strip()
 
-    if content_type == ContentType.PUBLICATION:
-        # Remove download noise
-        text = re.sub(r"(?i)(download|view)\s+(pdf|paper|full text)", "", text)
-
-    elif content_type == ContentType.CODE:
-        # Remove excess newlines but preserve structure
-        text = re.sub(r"\n{3,}", "\n\n", text)
-
-    elif content_type == ContentType.BIOGRAPHY:
-        # Remove CV boilerplate
-        text = re.sub(r"(?i)(curriculum vitae|download cv)", "", text)
+    noise = _TYPE_NOISE_RE.get(content_type)
+    if noise is not None:
+        text = noise.sub("", text)
 
     return text
 
@@ -672,6 +877,10 @@ def health_check():
                     "embedding_dim": Config.EMBEDDING_DIM,
                     "max_tokens": Config.MAX_TOKENS,
                     "batch_size": Config.BATCH_SIZE,
+                    "embedding_cache": {
+                        "size": len(embedding_cache),
+                        "max_size": Config.EMBED_CACHE_SIZE,
+                    },
                     "resources": {
                         "memory_rss_mb": mem_info.rss / 1024 / 1024,
                         "memory_vms_mb": mem_info.vms / 1024 / 1024,
@@ -1302,4 +1511,5 @@ if __name__ == "__main__":
     try:
         app.run(host=Config.HOST, port=Config.PORT, debug=debug_mode)
     finally:
+        model_manager.close()
         system_monitor.stop()
@@ -4,30 +4,65 @@ Receives, processes, and stores client-side logs with rich metadata
 Uses Elasticsearch for powerful search and analytics
 """
 
-import os
-import json
-import time
-import random
-import dotenv
-import logging
-import hashlib
-import traceback
-import inspect
-
-from colorama import Fore, Style, init
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from dataclasses import dataclass, asdict
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError
-from datetime import datetime, timezone
-from pathlib import Path
-from typing import Dict, Any, Optional, List
-from logging.handlers import RotatingFileHandler
+# gevent must patch sockets before anything else imports them, so that request
+# handlers waiting on Elasticsearch yield instead of blocking. Threads stay
+# real OS threads: the log listener, bulk flushers and rotation worker do
+# blocking disk/ES work that must not stall the hub serving requests.
+from gevent import monkey
+
+monkey.patch_all(thread=False)
+
+import os  # noqa: E402
+import abc  # noqa: E402
+import time  # noqa: E402
+import queue  # noqa: E402
+import atexit  # noqa: E402
+import random  # noqa: E402
+import dotenv  # noqa: E402
+import orjson  # noqa: E402
+import logging  # noqa: E402
+import hashlib  # noqa: E402
+import threading  # noqa: E402
+import functools  # noqa: E402
+import gevent  # noqa: E402
+import traceback  # noqa: E402
+
+from collections import OrderedDict  # noqa: E402
+from colorama import Fore, Style, init  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from flask import Flask, Response, request, jsonify  # noqa: E402
+from flask.json.provider import JSONProvider  # noqa: E402
+from flask_cors import CORS  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+from werkzeug.exceptions import RequestEntityTooLarge  # noqa: E402
+from dataclasses import dataclass  # noqa: E402
+from elasticsearch import Elasticsearch, helpers  # noqa: E402
+from elasticsearch.exceptions import NotFoundError  # noqa: E402
+from elasticsearch.serializer import OrjsonSerializer  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Dict, Any, Callable, Iterator, Optional, List, Union  # noqa: E402
+from logging.handlers import (  # noqa: E402
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+)
 
 dotenv.load_dotenv()
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for request/response bodies"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for client-side requests
 
 
@@ -47,6 +82,23 @@ class Config:
     # Elasticsearch Configuration
     ES_HOST = os.getenv("ELASTICSEARCH_HOST", "http://elasticsearch:9200")
     ES_TIMEOUT = 30
+    ES_CONNECTIONS = 32  # keep in step with the number of concurrent greenlets
+
+    # Request limits
+    MAX_PAYLOAD_BYTES = 256 * 1024  # single /logs/log body
+    MAX_BATCH_PAYLOAD_BYTES = 2 * 1024 * 1024  # /logs/batch body
+    MAX_STACK_TRACE_CHARS = 16 * 1024
+    MAX_EXTRA_DATA_BYTES = 16 * 1024
+    FINGERPRINT_MAX_CHARS = 1024  # message / stack-top prefix used for grouping
+
+    # Bulk writer configuration
+    BULK_CHUNK_SIZE = 500
+    BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024  # 10MB per bulk request
+    BULK_FLUSH_INTERVAL = 1.0  # seconds between background flushes
+    RECENT_ERRORS_MAX = 10_000  # fingerprints kept in the in-process LRU
+    BULK_THREAD_COUNT = int(
+        os.getenv("BULK_THREAD_COUNT", str(min(os.cpu_count() or 1, 8)))
+    )
 
     # Index names
     ERRORS_INDEX = "logging-errors"
@@ -56,6 +108,9 @@ class Config:
 # Create logs directory
 Config.LOG_DIR.mkdir(exist_ok=True)
 
+# Reject anything larger than the biggest endpoint allows before reading it
+app.config["MAX_CONTENT_LENGTH"] = Config.MAX_BATCH_PAYLOAD_BYTES
+
 
 # --- Data Models ---
 @dataclass
@@ -76,13 +131,57 @@ class LogEntry:
     extra_data: Optional[Dict[str, Any]] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        return {k: v for k, v in asdict(self).items() if v is not None}
+        # Every field is a primitive or a shallow dict, so a plain attribute
+        # read avoids dataclasses.asdict's recursive deep copy
+        return {
+            k: v
+            for k in self.__dataclass_fields__
+            if (v := getattr(self, k)) is not None
+        }
 
 
 # --- Elasticsearch Client ---
 es_client: Optional[Elasticsearch] = None
 
 
+def make_es_client(connections: int = Config.ES_CONNECTIONS) -> Elasticsearch:
+    return Elasticsearch(
+        [Config.ES_HOST],
+        request_timeout=Config.ES_TIMEOUT,
+        retry_on_timeout=True,
+        max_retries=3,
+        connections_per_node=connections,
+        http_compress=True,  # stack traces and bulk bodies compress well
+        sniff_on_start=False,
+        verify_certs=False,
+        serializer=OrjsonSerializer(),
+    )
+
+
+_thread_clients = threading.local()
+
+
+def thread_es_client() -> Elasticsearch:
+    """
+    Elasticsearch client owned by the calling OS thread. gevent sockets are
+    bound to the hub of the thread that opened them, so worker threads must
+    never reuse pooled connections from the request hub (or each other).
+    """
+    client = getattr(_thread_clients, "client", None)
+    if client is None:
+        client = _thread_clients.client = make_es_client(connections=2)
+    return client
+
+
+def run_off_hub(fn: Callable[[], Any]) -> Any:
+    """
+    Run blocking work (real locks, a worker thread's ES client) on gevent's
+    native threadpool, so the calling greenlet yields instead of stalling
+    every other request on the hub
+    """
+    return gevent.get_hub().threadpool.apply(fn)
+
+
 def init_elasticsearch():
     """Initialize Elasticsearch client and indices with exponential backoff"""
     global es_client
@@ -91,20 +190,19 @@ def init_elasticsearch():
     max_delay = 60.0  # cap max sleep time to 60s
     attempt: int = 0
 
+    # One client (and one connection pool) for the request greenlets; retries
+    # below only re-ping instead of rebuilding the transport each attempt.
+    # Background threads use thread_es_client() instead.
+    es_client = make_es_client()
+
     while True:
         attempt += 1
         try:
-            es_client = Elasticsearch(
-                [Config.ES_HOST],
-                request_timeout=Config.ES_TIMEOUT,
-                retry_on_timeout=True,
-                max_retries=3,
-                verify_certs=False,
-            )
-
             if es_client.ping():
                 app.logger.info("✅ Elasticsearch connected")
                 create_indices()
+                occurrence_writer.start()
+                error_coalescer.start()
                 return es_client
 
             raise ConnectionError("Ping failed")
@@ -128,6 +226,21 @@ def create_indices():
     if es_client is None:
         raise Exception("Elasticsearch client is not initialized")
 
+    # Both indices take far more writes than reads: refresh segments lazily and
+    # fsync the translog in the background instead of once per request. Newly
+    # written docs become searchable within refresh_interval; callers that need
+    # them immediately must issue an explicit refresh.
+    write_heavy_settings: Dict[str, Any] = {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "refresh_interval": "30s",
+        "translog": {
+            "durability": "async",
+            "sync_interval": "5s",
+            "flush_threshold_size": "1gb",
+        },
+    }
+
     # Errors index mapping
     errors_mapping: Dict[str, Any] = {
         "mappings": {
@@ -147,7 +260,7 @@ def create_indices():
                 "updated_at": {"type": "date"},
             }
         },
-        "settings": {"number_of_shards": 1, "number_of_replicas": 0},
+        "settings": {**write_heavy_settings},
     }
 
     # Occurrences index mapping
@@ -168,7 +281,8 @@ def create_indices():
                 "extra_data": {"type": "object", "enabled": True},
             }
         },
-        "settings": {"number_of_shards": 1, "number_of_replicas": 0},
+        # Occurrences are append-only and rarely read, so trade CPU for disk
+        "settings": {**write_heavy_settings, "codec": "best_compression"},
     }
 
     # Create indices if they don't exist
@@ -187,6 +301,83 @@ init(autoreset=True)  # ensures color reset after each print
 
 
 # --- Logging Configuration ---
+# Levels that are grouped and persisted to Elasticsearch
+STORED_LEVELS = frozenset({"error", "critical"})
+
+
+def resolve_log_level(level: str) -> int:
+    """
+    Map a client-supplied level name to a logging level. The receive paths
+    lowercase the level once (it is stored and filtered lowercase), so this
+    is a single dict probe.
+    """
+    return Config.LOG_LEVELS.get(level, logging.INFO)
+
+
+class BackgroundRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler whose rollover only renames the live file out of the
+    way and reopens it; shifting the numbered backups runs on a worker thread
+    so emit() never waits on a chain of renames
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # A single worker keeps rotations applied in the order they happened
+        self._rotation_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="log-rotation"
+        )
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+
+        if self.backupCount > 0 and os.path.exists(self.baseFilename):
+            pending = f"{self.baseFilename}.rotating.{time.time_ns()}"
+            os.rename(self.baseFilename, pending)
+            self._rotation_executor.submit(self._shift_backups, pending)
+
+        if not self.delay:
+            self.stream = self._open()
+
+    def _shift_backups(self, pending: str):
+        try:
+            for i in range(self.backupCount - 1, 0, -1):
+                src = self.rotation_filename(f"{self.baseFilename}.{i}")
+                dst = self.rotation_filename(f"{self.baseFilename}.{i + 1}")
+                if os.path.exists(src):
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                    os.rename(src, dst)
+
+            first = self.rotation_filename(f"{self.baseFilename}.1")
+            if os.path.exists(first):
+                os.remove(first)
+            self.rotate(pending, first)
+        except OSError as e:
+            app.logger.error(f"⚠️ Log rotation of {pending} failed: {e}", exc_info=True)
+
+    def close(self):
+        self._rotation_executor.shutdown(wait=True)
+        super().close()
+
+
+class ColorFormatter(logging.Formatter):
+    """Console formatter that wraps each line in its level's ANSI color"""
+
+    def __init__(self, fmt: str, datefmt: str, level_colors: Dict[str, str]):
+        super().__init__(fmt, datefmt=datefmt)
+        # Color prefixes are fixed per level, so resolve them once up front
+        self.level_prefix = dict(level_colors)
+        self.reset = Style.RESET_ALL
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        prefix = self.level_prefix.get(record.levelname)
+        return f"{prefix}{line}{self.reset}" if prefix else line
+
+
 class StructuredLogger:
     """Enhanced logging with rotation, structured output, line info, and colors"""
 
@@ -205,7 +396,7 @@ class StructuredLogger:
 
         # Rotating file handler
         log_file = Config.LOG_DIR / "client_errors.log"
-        file_handler = RotatingFileHandler(
+        file_handler = BackgroundRotatingFileHandler(
             log_file,
             maxBytes=Config.MAX_LOG_SIZE,
             backupCount=Config.BACKUP_COUNT,
@@ -216,36 +407,37 @@ class StructuredLogger:
             datefmt="%Y-%m-%d %H:%M:%S",
         )
         file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
 
-        # Console handler with colors
+        # Console handler with colors; the file handler above stays plain so
+        # the rotated logs carry no ANSI escape sequences
         console_handler = logging.StreamHandler()
-        console_formatter = logging.Formatter(
+        console_formatter = ColorFormatter(
             "%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s",
             datefmt="%H:%M:%S",
+            level_colors=self.LEVEL_COLORS,
         )
         console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
+
+        # Disk and console writes happen on a listener thread so that request
+        # threads only pay for a queue put, not for I/O or file rotation
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        self.logger.addHandler(QueueHandler(log_queue))
+        self.listener = QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self.listener.start()
+        atexit.register(self.listener.stop)
 
     def log(self, level: str, entry: LogEntry):
         """Log a structured entry with line info and colors"""
         log_data = entry.to_dict()
-        message = json.dumps(log_data, ensure_ascii=False)
-
-        # Get caller info
-        current_frame = inspect.currentframe()
-        frame = current_frame.f_back if current_frame is not None else None
-        filename = frame.f_code.co_filename if frame is not None else "<unknown>"
-        lineno = frame.f_lineno if frame is not None else 0
-
-        log_level = Config.LOG_LEVELS.get(level.lower(), logging.INFO)
+        message = orjson.dumps(log_data).decode()
 
-        # Add color for console output
-        color = self.LEVEL_COLORS.get(level.upper(), "")
-        colored_message = f"{color}{message}{Style.RESET_ALL}"
+        log_level = resolve_log_level(level)
 
-        # Log to console and file
-        self.logger.log(log_level, f"{filename}:{lineno} | {colored_message}")
+        # Log to console and file; stacklevel=2 attributes the record to our
+        # caller so the formatter's filename:lineno point at the endpoint
+        self.logger.log(log_level, message, stacklevel=2)
 
 
 logger = StructuredLogger("client_logger")
@@ -259,58 +451,195 @@ def generate_fingerprint(
     Generate a unique fingerprint for error grouping
     Similar errors will have the same fingerprint
     """
+    # Only the clamped message and the top of the stack take part in grouping,
+    # so reduce to those before the cached call: the LRU then keys on a few
+    # hundred bytes instead of pinning whole stack traces
+    stack_top = None
+    if stack_trace:
+        # Use first 3 lines of stack trace for fingerprinting
+        stack_top = "".join(stack_trace.split("\n", 3)[:3])
+        stack_top = stack_top[: Config.FINGERPRINT_MAX_CHARS]
+
+    # Payload values are unvalidated JSON; coerce them so the LRU key is
+    # always hashable (a list/dict url must not turn into a 500)
+    return _fingerprint(
+        str(message)[: Config.FINGERPRINT_MAX_CHARS], str(url), stack_top
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _fingerprint(message: str, url: str, stack_top: Optional[str]) -> str:
+    """
+    Memoised digest of the normalized key: production traffic is dominated
+    by a handful of recurring errors, so most calls skip hashing entirely.
+    """
     # Normalize the message (remove dynamic parts like IDs, timestamps)
     normalized = f"{message}|{url}"
 
-    if stack_trace:
-        # Use first 3 lines of stack trace for fingerprinting
-        stack_lines = stack_trace.split("\n")[:3]
-        normalized += "|" + "".join(stack_lines)
+    if stack_top:
+        normalized += "|" + stack_top
 
-    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+    # 128-bit BLAKE2b gives the same 32 hex chars as the old truncated SHA-256
+    # without computing (and discarding) the other half of a 256-bit digest
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
 
 
 # --- Elasticsearch Operations ---
-def store_error(entry: LogEntry) -> str:
+class BackgroundFlusher(abc.ABC):
+    """Runs `flush()` on a daemon thread every `flush_interval` seconds"""
 
-    global es_client
-    if es_client is None:
-        raise Exception("Elasticsearch client is not initialized")
+    thread_name = "background-flusher"
 
-    """Store or update error in Elasticsearch with occurrence tracking"""
+    def __init__(self, flush_interval: float = Config.BULK_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
 
-    # Search for existing error by fingerprint
-    search_query = {"query": {"term": {"fingerprint": entry.fingerprint}}}
+    def start(self):
+        """Start the background flusher thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
 
-    result = es_client.search(index=Config.ERRORS_INDEX, body=search_query, size=1)
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=self.thread_name, daemon=True
+        )
+        self._thread.start()
 
-    now = datetime.now(timezone.utc).isoformat()
+    @abc.abstractmethod
+    def flush(self) -> int:
+        """Write out everything pending; returns the number of docs written"""
 
-    if result["hits"]["total"]["value"] > 0:
-        # Update existing error
-        doc = result["hits"]["hits"][0]
-        doc_id = doc["_id"]
-        current_count = doc["_source"].get("count", 0)
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
 
-        update_body: Dict[str, Any] = {
-            "doc": {
-                "count": current_count + 1,
-                "last_seen": now,
-                "updated_at": now,
-                "latest_stack_trace": entry.stack_trace,
-                "latest_extra_data": entry.extra_data,
-            }
-        }
+    def stop(self):
+        """Stop the flusher thread and write out anything still pending"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+
+class OccurrenceWriter(BackgroundFlusher):
+    """Buffers occurrence documents and ships them to Elasticsearch in bulk"""
+
+    thread_name = "occurrence-writer"
+
+    def __init__(self, flush_interval: float = Config.BULK_FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        # Each bulk worker sends through its own thread_es_client()
+        self._bulk_executor = ThreadPoolExecutor(
+            max_workers=Config.BULK_THREAD_COUNT, thread_name_prefix="occurrence-bulk"
+        )
+
+    def submit(self, doc: Dict[str, Any]):
+        """Queue an occurrence document for the next bulk flush"""
+        self._queue.put(
+            {"_op_type": "index", "_index": Config.OCCURRENCES_INDEX, "_source": doc}
+        )
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        actions: List[Dict[str, Any]] = []
+        while True:
+            try:
+                actions.append(self._queue.get_nowait())
+            except queue.Empty:
+                return actions
+
+    @staticmethod
+    def _chunk_size(actions: List[Dict[str, Any]]) -> int:
+        """Docs per bulk request so a chunk stays near BULK_MAX_CHUNK_BYTES"""
+        sample = actions[:16]
+        avg_doc_size = sum(len(orjson.dumps(a["_source"])) for a in sample) / len(
+            sample
+        )
+        return max(
+            1,
+            min(
+                Config.BULK_CHUNK_SIZE,
+                int(Config.BULK_MAX_CHUNK_BYTES // max(avg_doc_size, 1)),
+            ),
+        )
 
-        es_client.update(index=Config.ERRORS_INDEX, id=doc_id, body=update_body)
-        error_id = doc_id
-    else:
-        # Create new error
-        error_doc: Dict[str, Any] = {
-            "fingerprint": entry.fingerprint,
-            "first_seen": now,
-            "last_seen": now,
-            "count": 1,
+    @staticmethod
+    def _send(actions: List[Dict[str, Any]]) -> int:
+        success, _ = helpers.bulk(
+            thread_es_client(),
+            actions,
+            chunk_size=len(actions),
+            max_chunk_bytes=Config.BULK_MAX_CHUNK_BYTES,
+            raise_on_error=False,
+        )
+        return success
+
+    def stop(self):
+        super().stop()
+        self._bulk_executor.shutdown(wait=True)
+
+    def flush(self) -> int:
+        """Send everything queued so far; returns the number of indexed docs"""
+        global es_client
+        if es_client is None:
+            return 0
+
+        with self._flush_lock:
+            actions = self._drain()
+            if not actions:
+                return 0
+
+            chunk_size = self._chunk_size(actions)
+            futures = [
+                self._bulk_executor.submit(self._send, actions[i : i + chunk_size])
+                for i in range(0, len(actions), chunk_size)
+            ]
+
+            success = 0
+            for future in futures:
+                try:
+                    success += future.result()
+                except Exception as e:
+                    app.logger.error(f"Bulk flush of occurrences failed: {e}")
+
+            if success < len(actions):
+                app.logger.warning(
+                    f"Bulk flush indexed {success}/{len(actions)} occurrences"
+                )
+            return success
+
+
+ERROR_UPSERT_SCRIPT = (
+    "ctx._source.count += params.n; "
+    "ctx._source.last_seen = params.last_seen; "
+    "ctx._source.updated_at = params.last_seen; "
+    "ctx._source.latest_stack_trace = params.stack_trace; "
+    "ctx._source.latest_extra_data = params.extra_data"
+)
+
+
+def error_upsert_body(
+    entry: LogEntry, fingerprint: str, n: int, first_seen: str, last_seen: str
+) -> Dict[str, Any]:
+    """Scripted upsert adding `n` occurrences to the error doc for `fingerprint`"""
+    return {
+        "script": {
+            "source": ERROR_UPSERT_SCRIPT,
+            "lang": "painless",
+            "params": {
+                "n": n,
+                "last_seen": last_seen,
+                "stack_trace": entry.stack_trace,
+                "extra_data": entry.extra_data,
+            },
+        },
+        "upsert": {
+            "fingerprint": fingerprint,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "count": n,
             "level": entry.level,
             "message": entry.message,
             "url": entry.url,
@@ -318,12 +647,173 @@ def store_error(entry: LogEntry) -> str:
             "resolved": False,
             "latest_stack_trace": entry.stack_trace,
             "latest_extra_data": entry.extra_data,
-            "created_at": now,
-            "updated_at": now,
+            "created_at": first_seen,
+            "updated_at": last_seen,
+        },
+    }
+
+
+class RecentErrors:
+    """
+    Bounded LRU set of fingerprints whose error document is known to exist.
+    Their coalesced bumps are sent as script-only updates; everything else
+    carries the full upsert document.
+    """
+
+    def __init__(self, max_size: int = Config.RECENT_ERRORS_MAX):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, None]" = OrderedDict()
+
+    def seen(self, fingerprint: str) -> bool:
+        """Record `fingerprint`; returns whether it was already known"""
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+                return True
+
+            self._entries[fingerprint] = None
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return False
+
+    def forget(self, fingerprint: str):
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class ErrorCoalescer(BackgroundFlusher):
+    """
+    Folds repeated occurrences of a fingerprint into one scripted upsert per
+    flush window, so an error storm costs one ES update per second instead of
+    one per request
+    """
+
+    thread_name = "error-coalescer"
+
+    def __init__(self, flush_interval: float = Config.BULK_FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, entry: LogEntry, now: str, known: bool = False):
+        """
+        Account one occurrence of `entry` in the current window. `known` means
+        the error document already exists, so the upsert body can be left out.
+        """
+        self._merge(
+            entry.fingerprint or "",
+            {"n": 1, "first_seen": now, "last_seen": now, "entry": entry},
+            known,
+        )
+
+    def _merge(self, fingerprint: str, update: Dict[str, Any], known: bool):
+        with self._lock:
+            pending = self._pending.get(fingerprint)
+            if pending is None:
+                self._pending[fingerprint] = {**update, "known": known}
+                return
+
+            pending["n"] += update["n"]
+            pending["known"] = pending["known"] and known
+            if update["first_seen"] < pending["first_seen"]:
+                pending["first_seen"] = update["first_seen"]
+            if update["last_seen"] >= pending["last_seen"]:
+                pending["last_seen"] = update["last_seen"]
+                pending["entry"] = update["entry"]
+
+    def _action(self, fingerprint: str, pending: Dict[str, Any]) -> Dict[str, Any]:
+        body = error_upsert_body(
+            pending["entry"],
+            fingerprint,
+            pending["n"],
+            pending["first_seen"],
+            pending["last_seen"],
+        )
+        if pending["known"]:
+            del body["upsert"]
+
+        return {
+            "_op_type": "update",
+            "_index": Config.ERRORS_INDEX,
+            "_id": fingerprint,
+            "retry_on_conflict": 3,
+            **body,
         }
 
-        result = es_client.index(index=Config.ERRORS_INDEX, document=error_doc)
-        error_id = result["_id"]
+    def flush(self) -> int:
+        """Write one scripted upsert per fingerprint seen since the last flush"""
+        global es_client
+        if es_client is None:
+            return 0
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            actions = [self._action(fp, p) for fp, p in pending.items()]
+            try:
+                success, errors = helpers.bulk(
+                    thread_es_client(),
+                    actions,
+                    chunk_size=Config.BULK_CHUNK_SIZE,
+                    max_chunk_bytes=Config.BULK_MAX_CHUNK_BYTES,
+                    raise_on_error=False,
+                )
+            except Exception as e:
+                app.logger.error(
+                    f"Flushing {len(actions)} error aggregates failed: {e}"
+                )
+                # Keep the window's counts: carry them into the next flush
+                for fingerprint, p in pending.items():
+                    self._merge(fingerprint, p, p["known"])
+                return 0
+
+            # A "known" doc can vanish (deleted, or its first flush failed):
+            # forget it and carry the bump into the next window as an upsert
+            for error in errors:
+                item = error.get("update", {})
+                missed = pending.get(item.get("_id", ""))
+                if item.get("status") == 404 and missed and missed["known"]:
+                    recent_errors.forget(item["_id"])
+                    self._merge(item["_id"], missed, known=False)
+
+            if success < len(actions):
+                app.logger.warning(f"Flushed {success}/{len(actions)} error aggregates")
+            return success
+
+
+occurrence_writer = OccurrenceWriter()
+error_coalescer = ErrorCoalescer()
+recent_errors = RecentErrors()
+atexit.register(occurrence_writer.stop)
+atexit.register(error_coalescer.stop)
+
+
+def store_error(entry: LogEntry, now: Optional[str] = None) -> str:
+
+    global es_client
+    if es_client is None:
+        raise Exception("Elasticsearch client is not initialized")
+
+    """Store or update error in Elasticsearch with occurrence tracking"""
+
+    if now is None:
+        now = datetime.now(timezone.utc).isoformat()
+
+    # The fingerprint doubles as the error document id
+    error_id = entry.fingerprint or ""
+
+    # The count/last_seen bump is coalesced and written by the background
+    # flusher; only the first sighting of a fingerprint needs the upsert doc
+    error_coalescer.record(entry, now, known=recent_errors.seen(error_id))
 
     # Store occurrence
     occurrence_doc: Dict[str, Any] = {
@@ -341,14 +831,72 @@ def store_error(entry: LogEntry) -> str:
         "extra_data": entry.extra_data,
     }
 
-    es_client.index(index=Config.OCCURRENCES_INDEX, document=occurrence_doc)
-
-    # Refresh indices to make documents searchable immediately
-    es_client.indices.refresh(index=Config.ERRORS_INDEX)
+    # Occurrences are append-only, so they go through the bulk writer
+    # instead of costing a round-trip on the request path
+    occurrence_writer.submit(occurrence_doc)
 
     return error_id
 
 
+# --- Request Parsing ---
+def read_json_body(max_bytes: int) -> Optional[Dict[str, Any]]:
+    """
+    Parse the request body with orjson, refusing bodies over `max_bytes`.
+    Returns None for malformed or non-object JSON; raises
+    RequestEntityTooLarge when the body is over the limit.
+    """
+    request.max_content_length = max_bytes
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def clamp_log_fields(log_data: Dict[str, Any]):
+    """Cap the free-form fields before they are fingerprinted or indexed"""
+    stack_trace = log_data.get("stack_trace")
+    if isinstance(stack_trace, str) and len(stack_trace) > Config.MAX_STACK_TRACE_CHARS:
+        log_data["stack_trace"] = stack_trace[: Config.MAX_STACK_TRACE_CHARS]
+
+    extra = log_data.get("extra")
+    if extra is not None:
+        extra_size = len(orjson.dumps(extra, option=orjson.OPT_NON_STR_KEYS))
+        if extra_size > Config.MAX_EXTRA_DATA_BYTES:
+            log_data["extra"] = {"truncated": True, "original_size": extra_size}
+
+
+def stream_json_list(
+    envelope: Dict[str, Any], list_key: str, items: Iterator[Dict[str, Any]]
+) -> Response:
+    """
+    Stream `{**envelope, list_key: [...items]}` as JSON, serialising each item
+    once instead of building the whole list and re-encoding it with jsonify.
+
+    Items are encoded before the Response is returned, so a failure raises in
+    the caller's try block and becomes its usual error response instead of a
+    truncated 200 body.
+    """
+    # Drop the closing brace of the envelope and append the list field
+    head = orjson.dumps(envelope)[:-1] + b',"' + list_key.encode() + b'":['
+    encoded = [orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) for item in items]
+
+    def generate() -> Iterator[bytes]:
+        yield head
+        for i, chunk in enumerate(encoded):
+            if i:
+                yield b","
+            yield chunk
+        yield b"]}"
+
+    return Response(generate(), status=200, mimetype="application/json")
+
+
+def payload_too_large_response():
+    return jsonify({"status": "error", "message": "Payload too large"}), 413
+
+
 # --- API Endpoints ---
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -359,6 +907,7 @@ def health_check():
     """Health check endpoint with Elasticsearch connectivity check"""
     try:
         es_health = es_client.cluster.health()
+        fingerprint_cache = _fingerprint.cache_info()
 
         return (
             jsonify(
@@ -370,6 +919,13 @@ def health_check():
                         "status": es_health["status"],
                         "cluster_name": es_health["cluster_name"],
                     },
+                    "recent_errors": len(recent_errors),
+                    "fingerprint_cache": {
+                        "hits": fingerprint_cache.hits,
+                        "misses": fingerprint_cache.misses,
+                        "size": fingerprint_cache.currsize,
+                        "max_size": fingerprint_cache.maxsize,
+                    },
                 }
             ),
             200,
@@ -406,7 +962,7 @@ def receive_log():
     }
     """
     try:
-        data = request.get_json(silent=True)
+        data = read_json_body(Config.MAX_PAYLOAD_BYTES)
 
         if not data:
             app.logger.warning(f"Invalid JSON payload from {request.remote_addr}")
@@ -421,6 +977,8 @@ def receive_log():
                 400,
             )
 
+        clamp_log_fields(data)
+
         # Extract and structure log data
         level = data.get("level", "info").lower()
         message = data.get("message", "No message provided")
@@ -429,9 +987,12 @@ def receive_log():
         # Generate fingerprint for error grouping
         fingerprint = generate_fingerprint(message, url, data.get("stack_trace"))
 
+        # One timestamp per request, shared by the entry and its storage
+        now = datetime.now(timezone.utc).isoformat()
+
         # Create structured log entry
         entry = LogEntry(
-            timestamp=datetime.now(timezone.utc).isoformat(),
+            timestamp=now,
             level=level,
             message=message,
             url=url,
@@ -449,22 +1010,24 @@ def receive_log():
         logger.log(level, entry)
 
         # Store in Elasticsearch for errors and above
-        if level in ["error", "critical"]:
-            error_id = store_error(entry)
+        if level in STORED_LEVELS:
+            error_id = store_error(entry, now=now)
             return (
                 jsonify(
                     {
                         "status": "success",
-                        "message": "Log received and stored",
+                        "message": "Log received and queued for storage",
                         "error_id": error_id,
                         "fingerprint": fingerprint,
                     }
                 ),
-                200,
+                202,
             )
 
         return jsonify({"status": "success", "message": "Log received"}), 200
 
+    except RequestEntityTooLarge:
+        return payload_too_large_response()
     except Exception as e:
         app.logger.error(
             f"Failed to process log: {e}\n{traceback.format_exc()}", exc_info=True
@@ -487,7 +1050,7 @@ def receive_log_batch():
     }
     """
     try:
-        data = request.get_json(silent=True)
+        data = read_json_body(Config.MAX_BATCH_PAYLOAD_BYTES)
 
         if not data or "logs" not in data:
             return jsonify({"status": "error", "message": "Missing 'logs' array"}), 400
@@ -501,6 +1064,7 @@ def receive_log_batch():
 
         processed_count = 0
         error_ids = []
+        now = datetime.now(timezone.utc).isoformat()
 
         # Process each log in the batch
         for log_data in logs:
@@ -508,6 +1072,8 @@ def receive_log_batch():
                 if "message" not in log_data:
                     continue
 
+                clamp_log_fields(log_data)
+
                 level = log_data.get("level", "info").lower()
                 message = log_data.get("message", "No message provided")
                 url = log_data.get("url", "N/A")
@@ -517,9 +1083,7 @@ def receive_log_batch():
                 )
 
                 entry = LogEntry(
-                    timestamp=log_data.get(
-                        "timestamp", datetime.now(timezone.utc).isoformat()
-                    ),
+                    timestamp=log_data.get("timestamp", now),
                     level=level,
                     message=message,
                     url=url,
@@ -535,8 +1099,8 @@ def receive_log_batch():
 
                 logger.log(level, entry)
 
-                if level in ["error", "critical"]:
-                    error_id = store_error(entry)
+                if level in STORED_LEVELS:
+                    error_id = store_error(entry, now=now)
                     error_ids.append(error_id)
 
                 processed_count += 1
@@ -558,6 +1122,8 @@ def receive_log_batch():
             200,
         )
 
+    except RequestEntityTooLarge:
+        return payload_too_large_response()
     except Exception as e:
         app.logger.error(
             f"Failed to process log batch: {e}\\n{traceback.format_exc()}",
@@ -601,23 +1167,21 @@ def get_errors():
 
         result = es_client.search(index=Config.ERRORS_INDEX, body=search_body)
 
-        errors: List[Dict[str, Any]] = []
-        for hit in result["hits"]["hits"]:
-            error_doc: Dict[str, Any] = hit["_source"]
-            error_doc["id"] = hit["_id"]
-            errors.append(error_doc)
+        def error_docs():
+            for hit in result["hits"]["hits"]:
+                error_doc: Dict[str, Any] = hit["_source"]
+                error_doc["id"] = hit["_id"]
+                yield error_doc
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "errors": errors,
-                    "total": result["hits"]["total"]["value"],
-                    "limit": limit,
-                    "offset": offset,
-                }
-            ),
-            200,
+        return stream_json_list(
+            {
+                "status": "success",
+                "total": result["hits"]["total"]["value"],
+                "limit": limit,
+                "offset": offset,
+            },
+            "errors",
+            error_docs(),
         )
 
     except Exception as e:
@@ -778,19 +1342,39 @@ def get_stats():
             },
         }
 
-        result = es_client.search(index=Config.ERRORS_INDEX, body=agg_body)
+        # Recent occurrences for the last 24h and last hour as two buckets of
+        # one filters aggregation instead of two separate count requests
+        recent_body: Dict[str, Any] = {
+            "size": 0,
+            "query": {"range": {"timestamp": {"gte": "now-24h"}}},
+            "aggs": {
+                "recent": {
+                    "filters": {
+                        "filters": {
+                            "24h": {"range": {"timestamp": {"gte": "now-24h"}}},
+                            "1h": {"range": {"timestamp": {"gte": "now-1h"}}},
+                        }
+                    }
+                }
+            },
+        }
 
-        # Recent occurrences (last 24 hours)
-        recent_24h_query = {"query": {"range": {"timestamp": {"gte": "now-24h"}}}}
-        recent_24h = es_client.count(
-            index=Config.OCCURRENCES_INDEX, body=recent_24h_query
-        )
+        # Ship both searches in a single msearch round-trip
+        responses = es_client.msearch(
+            body=[
+                {"index": Config.ERRORS_INDEX},
+                agg_body,
+                {"index": Config.OCCURRENCES_INDEX},
+                recent_body,
+            ]
+        )["responses"]
 
-        # Recent occurrences (last hour)
-        recent_1h_query = {"query": {"range": {"timestamp": {"gte": "now-1h"}}}}
-        recent_1h = es_client.count(
-            index=Config.OCCURRENCES_INDEX, body=recent_1h_query
-        )
+        for response in responses:
+            if "error" in response:
+                raise Exception(response["error"])
+
+        result, recent = responses
+        recent_buckets = recent["aggregations"]["recent"]["buckets"]
 
         # Parse aggregations
         aggs = result["aggregations"]
@@ -811,8 +1395,8 @@ def get_stats():
                     "stats": {
                         "total_errors": aggs["total_errors"]["value"],
                         "unresolved_errors": aggs["unresolved_errors"]["doc_count"],
-                        "recent_occurrences_24h": recent_24h["count"],
-                        "recent_occurrences_1h": recent_1h["count"],
+                        "recent_occurrences_24h": recent_buckets["24h"]["doc_count"],
+                        "recent_occurrences_1h": recent_buckets["1h"]["doc_count"],
                         "by_level": by_level,
                         "top_errors": top_errors,
                     },
@@ -870,25 +1454,25 @@ def search_errors():
 
         result = es_client.search(index=Config.ERRORS_INDEX, body=search_body)
 
-        errors: List[Dict[str, Any]] = []
-        for hit in result["hits"]["hits"]:
-            error_doc = hit["_source"]
-            error_doc["id"] = hit["_id"]
-            error_doc["score"] = hit["_score"]
-            if "highlight" in hit:
-                error_doc["highlight"] = hit["highlight"]
-            errors.append(error_doc)
+        hits = result["hits"]["hits"]
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "results": errors,
-                    "total": result["hits"]["total"]["value"],
-                    "count": len(errors),
-                }
-            ),
-            200,
+        def error_docs():
+            for hit in hits:
+                error_doc = hit["_source"]
+                error_doc["id"] = hit["_id"]
+                error_doc["score"] = hit["_score"]
+                if "highlight" in hit:
+                    error_doc["highlight"] = hit["highlight"]
+                yield error_doc
+
+        return stream_json_list(
+            {
+                "status": "success",
+                "total": result["hits"]["total"]["value"],
+                "count": len(hits),
+            },
+            "results",
+            error_docs(),
         )
 
     except Exception as e:
@@ -980,16 +1564,41 @@ def bulk_resolve():
                 400,
             )
 
+        query: Dict[str, Any] = {"terms": {"fingerprint": fingerprints}}
+
+        # The errors index refreshes every 30s and bumps sit in the coalescer
+        # for up to a second; without this, errors ingested just before the
+        # call are invisible to the count and to update_by_query
+        run_off_hub(error_coalescer.flush)
+        es_client.indices.refresh(index=Config.ERRORS_INDEX)
+
+        # Pre-flight count so an empty match doesn't launch an update task
+        matched = es_client.count(index=Config.ERRORS_INDEX, body={"query": query})
+        if matched["count"] == 0:
+            return (
+                jsonify({"status": "success", "message": "Resolved 0 errors"}),
+                200,
+            )
+
         # Update all matching documents
         update_body: Dict[str, Any] = {
-            "query": {"terms": {"fingerprint": fingerprints}},
+            "query": query,
             "script": {
                 "source": "ctx._source.resolved = true; ctx._source.updated_at = params.now",
                 "params": {"now": datetime.now(timezone.utc).isoformat()},
             },
         }
 
-        result = es_client.update_by_query(index=Config.ERRORS_INDEX, body=update_body)
+        # Concurrent upserts from the coalescer can bump a doc's version mid-run;
+        # proceed past those conflicts instead of aborting the whole request
+        result = es_client.update_by_query(
+            index=Config.ERRORS_INDEX,
+            body=update_body,
+            conflicts="proceed",
+            refresh=True,
+            wait_for_completion=True,
+            slices="auto",
+        )
 
         return (
             jsonify(
@@ -1003,12 +1612,47 @@ def bulk_resolve():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/admin/refresh", methods=["POST"])
+def admin_refresh():
+    global es_client
+    if es_client is None:
+        raise Exception("Elasticsearch client is not initialized")
+
+    """Flush buffered writes and refresh indices for immediate visibility"""
+    try:
+        errors_flushed = run_off_hub(error_coalescer.flush)
+        occurrences_flushed = run_off_hub(occurrence_writer.flush)
+
+        es_client.indices.refresh(index=[Config.ERRORS_INDEX, Config.OCCURRENCES_INDEX])
+
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "message": "Indices refreshed",
+                    "errors_flushed": errors_flushed,
+                    "occurrences_flushed": occurrences_flushed,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        app.logger.error(f"Refresh failed: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 # --- Error Handlers ---
 @app.errorhandler(404)
 def not_found(e: Exception):
     return jsonify({"status": "error", "message": f"Endpoint not found: {e}"}), 404
 
 
+@app.errorhandler(413)
+def payload_too_large(e: Exception):
+    return payload_too_large_response()
+
+
 @app.errorhandler(500)
 def internal_error(e: Exception):
     return jsonify({"status": "error", "message": f"Internal server error: {e}"}), 500
@@ -1046,8 +1690,9 @@ if __name__ == "__main__":
     print("  GET  /logs/stats                    - Statistics")
     print("  GET  /logs/search?q=<query>         - Full-text search")
     print("  GET  /logs/timeline                 - Error timeline")
+    print("  POST /admin/refresh                 - Flush writes and refresh indices")
     print("  GET  /health                       - Health check")
     print("\n💡 Environment variables:")
     print("  ELASTICSEARCH_HOST (default: http://elasticsearch:9200)")
 
-    app.run(host="0.0.0.0", port=5257, debug=False)
+    WSGIServer(("0.0.0.0", 5257), app).serve_forever()
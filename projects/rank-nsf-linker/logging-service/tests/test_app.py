@@ -0,0 +1,32 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app as logging_app  # noqa: E402
+
+
+class TestFingerprintPayloads(unittest.TestCase):
+    def setUp(self):
+        self.client = logging_app.app.test_client()
+
+    def test_fingerprint_coerces_unhashable_url(self):
+        fingerprint = logging_app.generate_fingerprint("x", ["a"])
+        self.assertEqual(fingerprint, logging_app.generate_fingerprint("x", "['a']"))
+
+    def test_log_with_list_url(self):
+        response = self.client.post("/logs/log", json={"message": "x", "url": ["a"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "success")
+
+    def test_batch_with_list_url(self):
+        response = self.client.post(
+            "/logs/batch", json={"logs": [{"message": "x", "url": ["a"]}]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["processed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ Exports sentence-transformers model to ONNX format for production use.
 
 import sys
 import os
+import json
 from pathlib import Path
 from typing import Optional
 
@@ -49,6 +50,205 @@ def validate_existing_model(output_path: Path) -> bool:
     return True
 
 
+def quantize_model(output_path: Path) -> Path:
+    """
+    Write an INT8 dynamically quantized copy of model.onnx.
+
+    Only MatMul nodes are quantized; LayerNorm/GELU stay in FP32 to avoid
+    accuracy loss.
+
+    Returns:
+        Path to model_quantized.onnx
+    """
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    qconfig = AutoQuantizationConfig.avx512_vnni(
+        is_static=False, per_channel=True, operators_to_quantize=["MatMul"]
+    )
+    quantizer = ORTQuantizer.from_pretrained(str(output_path), file_name="model.onnx")
+    quantizer.quantize(save_dir=str(output_path), quantization_config=qconfig)
+
+    return output_path / "model_quantized.onnx"
+
+
+def optimize_model(output_path: Path) -> Path:
+    """
+    Run ORT graph optimizations once and persist the optimized graph, so
+    consumer sessions don't redo fusion/constant folding on every startup.
+
+    The ORT_ENABLE_ALL graph may contain layout-specific fused ops, so it is
+    meant for the same execution provider/CPU family it was built on.
+
+    Returns:
+        Path to model_optimized.onnx
+    """
+    import onnxruntime as ort
+
+    optimized_file = output_path / "model_optimized.onnx"
+
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    so.optimized_model_filepath = str(optimized_file)
+
+    # Creating the session is what writes optimized_model_filepath
+    ort.InferenceSession(
+        str(output_path / "model.onnx"), so, providers=["CPUExecutionProvider"]
+    )
+
+    return optimized_file
+
+
+def convert_model_fp16(output_path: Path) -> Path:
+    """
+    Write a half-precision copy of model.onnx for batch embedding on GPUs or
+    AVX512-FP16 CPUs. Graph inputs/outputs stay FP32 so callers feed and read
+    the same tensors as with the FP32 model.
+
+    Returns:
+        Path to model_fp16.onnx
+    """
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    fp16_file = output_path / "model_fp16.onnx"
+
+    model = onnx.load(str(output_path / "model.onnx"))
+    onnx.save(convert_float_to_float16(model, keep_io_types=True), str(fp16_file))
+
+    return fp16_file
+
+
+def convert_model_ort(output_path: Path) -> Path:
+    """
+    Serialize the model in ORT format. Loaded from a bytes buffer with the
+    session config entries in SESSION_RECIPE["ort_format"], ORT uses the
+    buffer in place and points initializers into it instead of copying the
+    weights onto the heap.
+
+    Returns:
+        Path to model.ort
+    """
+    import onnxruntime as ort
+
+    ort_file = output_path / "model.ort"
+
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    so.optimized_model_filepath = str(ort_file)
+    so.add_session_config_entry("session.save_model_format", "ORT")
+
+    ort.InferenceSession(
+        str(output_path / "model.onnx"), so, providers=["CPUExecutionProvider"]
+    )
+
+    return ort_file
+
+
+# Derived artifacts built from model.onnx: (file name, description, builder).
+# Missing variants are (re)built even when the base model is already present.
+MODEL_VARIANTS = [
+    ("model_quantized.onnx", "INT8 dynamic quantization", quantize_model),
+    ("model_optimized.onnx", "ORT_ENABLE_ALL optimized graph", optimize_model),
+    ("model_fp16.onnx", "FP16 weights (GPU / AVX512-FP16)", convert_model_fp16),
+    ("model.ort", "ORT format (zero-copy initializers)", convert_model_ort),
+]
+
+
+def prune_invalid_variants(output_path: Path) -> None:
+    """
+    Delete derived variants that are too small to be valid (e.g. left behind
+    by an interrupted build), so they are rebuilt instead of picked up.
+    """
+    for file_name, _, _ in MODEL_VARIANTS:
+        variant_file = output_path / file_name
+        if variant_file.exists() and variant_file.stat().st_size < 1024 * 1024:
+            print(f"→ {file_name} too small, removing so it is rebuilt")
+            variant_file.unlink()
+
+
+def build_model_variants(output_path: Path) -> None:
+    """Build any missing derived variants. Failures are reported, not fatal."""
+    prune_invalid_variants(output_path)
+
+    for file_name, description, builder in MODEL_VARIANTS:
+        variant_file = output_path / file_name
+        if variant_file.exists():
+            print(f"✓ {description} already present: {file_name}")
+            continue
+
+        print(f"→ Building {description}: {file_name}")
+        try:
+            builder(output_path)
+            size = variant_file.stat().st_size / (1024 * 1024)
+            print(f"✓ {description} written ({size:.2f} MB)")
+        except Exception as e:
+            print(f"✗ {description} failed: {e}", file=sys.stderr)
+
+    # Tell consumers which artifact suits which execution provider
+    print("→ Model variants for consumers:")
+    print("  CPUExecutionProvider (VNNI): model_quantized.onnx")
+    print("  CPUExecutionProvider:        model_optimized.onnx")
+    print("  CUDAExecutionProvider:       model_fp16.onnx")
+    print("  Low-RSS CPU workers:         model.ort (see session_options.json)")
+    print("  Fallback:                    model.onnx")
+
+
+# Session settings for consumers of this export. The encoder is small
+# (~90MB), so ORT's default arena growth over-allocates several times the
+# model size; these keep steady-state RSS close to what is actually used.
+SESSION_RECIPE = {
+    "session_options": {
+        "enable_cpu_mem_arena": False,
+        "enable_mem_pattern": False,
+    },
+    "provider_options": {
+        "CUDAExecutionProvider": {"arena_extend_strategy": "kSameAsRequested"},
+    },
+    # Only valid when loading model.ort from a bytes buffer that outlives
+    # the session: ORT then references the buffer instead of copying it
+    "ort_format": {
+        "model_file": "model.ort",
+        "session_config_entries": {
+            "session.use_ort_model_bytes_directly": "1",
+            "session.use_ort_model_bytes_for_initializers": "1",
+        },
+    },
+}
+
+SESSION_RECIPE_SNIPPET = """\
+    recipe = json.load(open(model_dir / "session_options.json"))
+    so = ort.SessionOptions()
+    for key, value in recipe["session_options"].items():
+        setattr(so, key, value)
+    providers = [(p, recipe["provider_options"].get(p, {})) for p in wanted]
+    session = ort.InferenceSession(model_path, so, providers=providers)
+
+  Or, sharing weights with the buffer (keep model_bytes alive):
+    for key, value in recipe["ort_format"]["session_config_entries"].items():
+        so.add_session_config_entry(key, value)
+    model_bytes = (model_dir / recipe["ort_format"]["model_file"]).read_bytes()
+    session = ort.InferenceSession(model_bytes, so, providers=providers)"""
+
+
+def write_session_recipe(output_path: Path) -> Path:
+    """
+    Write session_options.json next to the model so downstream sessions load
+    with the memory settings above instead of ORT defaults.
+
+    Returns:
+        Path to session_options.json
+    """
+    recipe_file = output_path / "session_options.json"
+    recipe_file.write_text(json.dumps(SESSION_RECIPE, indent=2) + "\n")
+
+    print(f"✓ Session recipe written: {recipe_file.name}")
+    print("  Load it with:")
+    print(SESSION_RECIPE_SNIPPET)
+
+    return recipe_file
+
+
 def export_model(
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
     output_dir: str = "./models/all-MiniLM-L6-v2-onnx",
@@ -71,6 +271,8 @@ def export_model(
             print(f"✓ Valid model already exists at {output_path.absolute()}")
             print(f"  Size: {model_size:.2f} MB")
             print(f"  Skipping download/export")
+            build_model_variants(output_path)
+            write_session_recipe(output_path)
             return 0
 
         # Create output directory
@@ -106,6 +308,10 @@ def export_model(
             print(f"✗ Model validation failed after export", file=sys.stderr)
             return 1
 
+        # Derived variants for downstream embedders (prefer these when present)
+        build_model_variants(output_path)
+        write_session_recipe(output_path)
+
         # Print file sizes
         model_size = (output_path / "model.onnx").stat().st_size / (1024 * 1024)
         print(f"✓ Model exported successfully")
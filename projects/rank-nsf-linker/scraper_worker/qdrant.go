@@ -265,6 +265,12 @@ func (q *QdrantClient) EnsureCollection(collyCtx *colly.Context, vectorSize uint
 		VectorsConfig: qdrant.NewVectorsConfig(&qdrant.VectorParams{
 			Size:     vectorSize,
 			Distance: qdrant.Distance_Cosine,
+			// Half-precision storage: cosine ranking is unaffected at this dimension
+			Datatype: qdrant.Datatype_Float16.Enum(),
+		}),
+		QuantizationConfig: qdrant.NewQuantizationScalar(&qdrant.ScalarQuantization{
+			Type:      qdrant.QuantizationType_Int8,
+			AlwaysRam: qdrant.PtrOf(true),
 		}),
 	})
 
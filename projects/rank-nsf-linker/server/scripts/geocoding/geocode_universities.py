@@ -1,8 +1,10 @@
 import os
-import time
-import requests
+import csv
+import atexit
+import asyncio
+import aiohttp
 import psycopg2
-import pandas as pd
+import psycopg2.extras
 import dotenv
 
 dotenv.load_dotenv()
@@ -10,6 +12,10 @@ dotenv.load_dotenv()
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
 CACHE_CSV = "geocoded_cache.csv"
 
+# Mapbox allows 600 req/min: 10 in flight, each slot held >= 1s => <= 10 req/s
+MAX_CONCURRENCY = 10
+MIN_SLOT_SECONDS = 1.0
+
 # -----------------------
 # 1. Connect to Postgres
 # -----------------------
@@ -26,25 +32,28 @@ cur = conn.cursor()
 # -----------------------
 # 2. Load CSV cache
 # -----------------------
+cache = {}
 if os.path.exists(CACHE_CSV):
-    cache_df = pd.read_csv(CACHE_CSV)
-else:
-    cache_df = pd.DataFrame(columns=["institution", "latitude", "longitude"])
+    with open(CACHE_CSV, newline="") as f:
+        for row in csv.DictReader(f):
+            cache[row["institution"]] = (float(row["latitude"]), float(row["longitude"]))
+
+# Append-only writer: one row per new geocode instead of rewriting the whole file
+write_header = not os.path.exists(CACHE_CSV) or os.path.getsize(CACHE_CSV) == 0
+cache_fh = open(CACHE_CSV, "a", newline="")
+atexit.register(cache_fh.close)
+cache_writer = csv.writer(cache_fh)
+if write_header:
+    cache_writer.writerow(["institution", "latitude", "longitude"])
+    cache_fh.flush()
 
 def from_cache(institution):
-    row = cache_df.loc[cache_df["institution"] == institution]
-    if not row.empty:
-        return row.iloc[0]["latitude"], row.iloc[0]["longitude"]
-    return None, None
+    return cache.get(institution, (None, None))
 
 def add_to_cache(institution, lat, lon):
-    global cache_df
-    cache_df = pd.concat([cache_df, pd.DataFrame([{
-        "institution": institution,
-        "latitude": lat,
-        "longitude": lon
-    }])], ignore_index=True)
-    cache_df.to_csv(CACHE_CSV, index=False)
+    cache[institution] = (lat, lon)
+    cache_writer.writerow([institution, lat, lon])
+    cache_fh.flush()
 
 # -----------------------
 # 3. Fetch un-geocoded rows
@@ -61,49 +70,78 @@ print(f"Found {len(rows)} ungeocoded rows")
 # -----------------------
 # 4. Mapbox Geocode helper
 # -----------------------
-def geocode(address):
+async def geocode(session, sem, address):
     url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{address}.json"
     params = {"access_token": MAPBOX_TOKEN, "limit": 1}
-    r = requests.get(url, params=params)
-    if r.status_code != 200:
-        print("Mapbox error:", r.status_code, r.text)
-        return None, None
-    data = r.json()
+    async with sem:
+        try:
+            async with session.get(url, params=params) as r:
+                if r.status != 200:
+                    print("Mapbox error:", r.status, await r.text())
+                    return None, None
+                data = await r.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print("Mapbox error:", e)
+            return None, None
+        finally:
+            await asyncio.sleep(MIN_SLOT_SECONDS)  # respect rate limits
     if data.get("features"):
         lon, lat = data["features"][0]["geometry"]["coordinates"]
         return lat, lon
     return None, None
 
+async def geocode_and_cache(session, sem, institution, address):
+    lat, lon = await geocode(session, sem, address)
+    if lat and lon:
+        print(f"🌍 Geocoded {institution}: ({lat}, {lon})")
+        add_to_cache(institution, lat, lon)  # persisted as each result lands
+        return lat, lon, institution
+    print(f"⚠️ Failed to geocode {institution}")
+    return None
+
+async def geocode_all(misses):
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # One failed lookup must not discard the rest of the run's results
+        results = await asyncio.gather(
+            *(geocode_and_cache(session, sem, inst, address) for inst, address in misses),
+            return_exceptions=True,
+        )
+    for (institution, _), result in zip(misses, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Failed to geocode {institution}: {result}")
+    return [r for r in results if not isinstance(r, Exception)]
+
 # -----------------------
-# 5. Iterate through rows
+# 5. Resolve rows (cache first, then concurrent geocoding)
 # -----------------------
+updates = []
+misses = []
 for r in rows:
     institution, street, city, zip_code, country = r
     lat, lon = from_cache(institution)
 
     if lat and lon:
         print(f"✅ Cache hit: {institution}")
+        updates.append((lat, lon, institution))
     else:
         # Build query
         address = ", ".join([str(x) for x in [institution, street, city, zip_code, country] if x])
-        lat, lon = geocode(address)
-        time.sleep(0.2)  # respect rate limits
-
-        if lat and lon:
-            print(f"🌍 Geocoded {institution}: ({lat}, {lon})")
-            add_to_cache(institution, lat, lon)
-        else:
-            print(f"⚠️ Failed to geocode {institution}")
-            continue
-
-    # -----------------------
-    # 6. UPSERT into Postgres
-    # -----------------------
-    cur.execute("""
-        UPDATE public.universities
-        SET latitude = %s, longitude = %s
-        WHERE institution = %s;
-    """, (lat, lon, institution))
+        misses.append((institution, address))
+
+if misses:
+    updates.extend(u for u in asyncio.run(geocode_all(misses)) if u)
+
+# -----------------------
+# 6. UPSERT into Postgres
+# -----------------------
+psycopg2.extras.execute_batch(cur, """
+    UPDATE public.universities
+    SET latitude = %s, longitude = %s
+    WHERE institution = %s;
+""", updates)
 
 print("✅ All done.")
 
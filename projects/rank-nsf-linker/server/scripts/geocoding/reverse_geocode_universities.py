@@ -1,83 +1,136 @@
 import os
-import time
-import pandas as pd
+import csv
+import atexit
+import sqlite3
+import asyncio
+import aiohttp
 import psycopg2
-import requests
+import psycopg2.extras
 import dotenv
 
 dotenv.load_dotenv()
 
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
+CACHE_DB = "reverse_geocoded_cache.sqlite"
+# Legacy CSV cache: read only to seed an empty CACHE_DB and never written again,
+# so after that first import it goes stale and CACHE_DB is the source of truth
 CACHE_CSV = "reverse_geocoded_cache.csv"
+CACHE_FLUSH_EVERY = 100
+UPDATE_BATCH_SIZE = 500
+FETCH_CHUNK_SIZE = 1000
+CACHE_COLUMNS = [
+    "institution",
+    "latitude",
+    "longitude",
+    "street_address",
+    "city",
+    "zip_code",
+    "country",
+]
+
+# Mapbox allows 600 req/min: 10 in flight, each slot held >= 1s => <= 10 req/s
+MAX_CONCURRENCY = 10
+MIN_SLOT_SECONDS = 1.0
+
+# Batch geocoding (<= 50 queries/request) needs permanent-endpoint access
+MAPBOX_BATCH = os.getenv("MAPBOX_BATCH", "false").lower() == "true"
+MAPBOX_BATCH_SIZE = 50
+
 
 # -----------------------
 # 1. Connect to Postgres
 # -----------------------
-conn = psycopg2.connect(
-    host="localhost",  # docker exposes 5432 -> localhost
-    port=5432,
-    dbname="rank-nsf-linker",
-    user="postgres",
-    password=os.getenv("POSTGRES_PASSWORD", "postgres"),
-)
-conn.autocommit = True
-cur = conn.cursor()
+def connect():
+    return psycopg2.connect(
+        host="localhost",  # docker exposes 5432 -> localhost
+        port=5432,
+        dbname="rank-nsf-linker",
+        user="postgres",
+        password=os.getenv("POSTGRES_PASSWORD", "postgres"),
+    )
+
+
+# Reads and writes use separate connections: committing on the reading one
+# would force Postgres to materialize the whole streamed result set
+conn = connect()  # holds the streaming cursor's transaction open
+write_conn = connect()
+write_conn.autocommit = False  # each UPDATE batch ships as one transaction
+cur = write_conn.cursor()
 
 # -----------------------
-# 2. Load CSV cache
+# 2. Open SQLite cache
 # -----------------------
-if os.path.exists(CACHE_CSV):
-    cache_df = pd.read_csv(CACHE_CSV)
-else:
-    cache_df = pd.DataFrame(
-        columns=[
-            "institution",
-            "latitude",
-            "longitude",
-            "street_address",
-            "city",
-            "zip_code",
-            "country",
-        ]
+# Keyed by institution: each hit is one indexed INSERT instead of a full CSV rewrite
+cache_db = sqlite3.connect(CACHE_DB)
+cache_db.execute(
+    """
+    CREATE TABLE IF NOT EXISTS cache (
+        institution TEXT PRIMARY KEY,
+        latitude REAL,
+        longitude REAL,
+        street_address TEXT,
+        city TEXT,
+        zip_code TEXT,
+        country TEXT
     )
+"""
+)
+
+if (
+    os.path.exists(CACHE_CSV)
+    and cache_db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+):
+    # First row per institution wins, matching the old DataFrame lookup
+    with open(CACHE_CSV, newline="") as f:
+        cache_db.executemany(
+            "INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ([row[c] for c in CACHE_COLUMNS] for row in csv.DictReader(f)),
+        )
+    cache_db.commit()
+
+pending_writes = 0
+
+
+def flush_cache():
+    global pending_writes
+    cache_db.commit()
+    pending_writes = 0
 
 
 def from_cache(institution):
-    row = cache_df.loc[cache_df["institution"] == institution]
-    if not row.empty:
-        r = row.iloc[0]
-        return r["street_address"], r["city"], r["zip_code"], r["country"]
+    r = cache_db.execute(
+        "SELECT street_address, city, zip_code, country FROM cache WHERE institution = ?",
+        (institution,),
+    ).fetchone()
+    if r is not None:
+        return r
     return None, None, None, None
 
 
 def add_to_cache(institution, lat, lon, street, city, zip_code, country):
-    global cache_df
-    cache_df = pd.concat(
-        [
-            cache_df,
-            pd.DataFrame(
-                [
-                    {
-                        "institution": institution,
-                        "latitude": lat,
-                        "longitude": lon,
-                        "street_address": street,
-                        "city": city,
-                        "zip_code": zip_code,
-                        "country": country,
-                    }
-                ]
-            ),
-        ],
-        ignore_index=True,
+    global pending_writes
+    cache_db.execute(
+        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (institution, lat, lon, street, city, zip_code, country),
     )
-    cache_df.to_csv(CACHE_CSV, index=False)
+
+    pending_writes += 1
+    if pending_writes >= CACHE_FLUSH_EVERY:
+        flush_cache()
+
+
+atexit.register(cache_db.close)
+atexit.register(flush_cache)  # atexit is LIFO: commit, then close
 
 
 # -----------------------
 # 3. Fetch rows missing address
 # -----------------------
-cur.execute(
+# Server-side cursor: rows stream in chunks instead of one fetchall(); the
+# UPDATE commits go through write_conn, so no WITH HOLD is needed
+stream_cur = conn.cursor(name="reverse_geocode_stream")
+stream_cur.itersize = FETCH_CHUNK_SIZE
+stream_cur.execute(
     """
     SELECT institution, latitude, longitude
     FROM public.universities
@@ -86,23 +139,13 @@ cur.execute(
       AND longitude IS NOT NULL;
 """
 )
-rows = cur.fetchall()
-print(f"Found {len(rows)} rows needing reverse geocoding")
 
 
 # -----------------------
 # 4. Mapbox reverse geocode helper
 # -----------------------
-def reverse_geocode(lat, lon):
-    url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{lon},{lat}.json"
-    params = {"access_token": MAPBOX_TOKEN, "limit": 1}
-    r = requests.get(url, params=params)
-    if r.status_code != 200:
-        print("Mapbox error:", r.status_code, r.text)
-        return None, None, None, None
-
-    data = r.json()
-    if not data.get("features"):
+def parse_feature_collection(data):
+    if not data or not data.get("features"):
         return None, None, None, None
 
     feature = data["features"][0]
@@ -121,39 +164,133 @@ def reverse_geocode(lat, lon):
     return street, city, zip_code, country
 
 
+async def fetch_json(session, sem, url):
+    params = {"access_token": MAPBOX_TOKEN, "limit": 1}
+    async with sem:
+        try:
+            async with session.get(url, params=params) as r:
+                if r.status != 200:
+                    print("Mapbox error:", r.status, await r.text())
+                    return None
+                return await r.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print("Mapbox error:", e)
+            return None
+        finally:
+            await asyncio.sleep(MIN_SLOT_SECONDS)  # respect rate limits
+
+
+async def reverse_geocode(session, sem, lat, lon):
+    url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{lon},{lat}.json"
+    return parse_feature_collection(await fetch_json(session, sem, url))
+
+
+async def reverse_geocode_batch(session, sem, coords):
+    query = ";".join(f"{lon},{lat}" for lat, lon in coords)
+    url = f"https://api.mapbox.com/geocoding/v5/mapbox.places-permanent/{query}.json"
+    data = await fetch_json(session, sem, url)
+
+    # Batch responses are a list of FeatureCollections in query order
+    # (a single-query batch comes back as one object)
+    if isinstance(data, dict):
+        data = [data]
+    data = data or []
+    data += [None] * (len(coords) - len(data))
+    return [parse_feature_collection(d) for d in data[: len(coords)]]
+
+
+# -----------------------
+# 5. Batched Postgres update
+# -----------------------
+UPDATE_SQL = """
+    UPDATE public.universities
+    SET street_address = COALESCE(%s, street_address),
+        city = COALESCE(%s, city),
+        zip_code = COALESCE(%s, zip_code),
+        country = COALESCE(%s, country)
+    WHERE institution = %s;
+"""
+updates = []
+
+
+def flush_updates():
+    if not updates:
+        return
+    psycopg2.extras.execute_batch(cur, UPDATE_SQL, updates, page_size=UPDATE_BATCH_SIZE)
+    write_conn.commit()
+    updates.clear()
+
+
+async def reverse_geocode_all(coords):
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    # One keep-alive pool sized to the concurrency cap; TLS handshakes are reused
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if not MAPBOX_BATCH:
+            return await asyncio.gather(
+                *(reverse_geocode(session, sem, lat, lon) for lat, lon in coords)
+            )
+
+        chunks = [
+            coords[i : i + MAPBOX_BATCH_SIZE]
+            for i in range(0, len(coords), MAPBOX_BATCH_SIZE)
+        ]
+        batches = await asyncio.gather(
+            *(reverse_geocode_batch(session, sem, chunk) for chunk in chunks)
+        )
+        return [result for batch in batches for result in batch]
+
+
 # -----------------------
-# 5. Process each row
+# 6. Process rows chunk by chunk (cache first, then concurrent reverse geocoding)
 # -----------------------
-for r in rows:
-    institution, lat, lon = r
-    street, city, zip_code, country = from_cache(institution)
-
-    if street:
-        print(f"✅ Cache hit for ({lat}, {lon})")
-    else:
-        street, city, zip_code, country = reverse_geocode(lat, lon)
-        time.sleep(0.2)
+def process_rows(rows):
+    misses = []
+    for r in rows:
+        institution, lat, lon = r
+        street, city, zip_code, country = from_cache(institution)
+
+        if street:
+            print(f"✅ Cache hit for ({lat}, {lon})")
+            updates.append((street, city, zip_code, country, institution))
+            if len(updates) >= UPDATE_BATCH_SIZE:
+                flush_updates()
+        else:
+            misses.append(r)
+
+    if not misses:
+        return
+
+    results = asyncio.run(reverse_geocode_all([(lat, lon) for _, lat, lon in misses]))
+
+    for (institution, lat, lon), (street, city, zip_code, country) in zip(
+        misses, results
+    ):
         if not street and not city:
             print(f"⚠️ Failed reverse geocode ({lat}, {lon})")
             continue
         add_to_cache(institution, lat, lon, street, city, zip_code, country)
         print(f"🏙️ Reverse geocoded ({institution} - {lat}, {lon}) -> {street}, {city}")
 
-    # -----------------------
-    # 6. Update Postgres
-    # -----------------------
-    cur.execute(
-        """
-        UPDATE public.universities
-        SET street_address = COALESCE(%s, street_address),
-            city = COALESCE(%s, city),
-            zip_code = COALESCE(%s, zip_code),
-            country = COALESCE(%s, country)
-        WHERE institution = %s;
-    """,
-        (street, city, zip_code, country, institution),
-    )
+        updates.append((street, city, zip_code, country, institution))
+        if len(updates) >= UPDATE_BATCH_SIZE:
+            flush_updates()
 
-print("✅ Reverse geocoding complete.")
-cur.close()
+
+total = 0
+while True:
+    chunk = stream_cur.fetchmany(FETCH_CHUNK_SIZE)
+    if not chunk:
+        break
+    total += len(chunk)
+    print(f"Processing {len(chunk)} rows needing reverse geocoding ({total} so far)")
+    process_rows(chunk)
+
+flush_updates()
+
+print(f"✅ Reverse geocoding complete ({total} rows).")
+stream_cur.close()
 conn.close()
+cur.close()
+write_conn.close()
@@ -17,7 +17,14 @@ import concurrent.futures as cf
 import logging
 import threading
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+from typing import IO, Dict, Optional, Tuple, List
+
+# Archives up to this size stay in memory while downloading; larger spill to disk
+SPOOL_MAX_BYTES = 64 << 20
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+
+# Set IPEDS_LOAD_POSTGRES=true to COPY each export into existing ipeds_* tables
+LOAD_POSTGRES = os.getenv("IPEDS_LOAD_POSTGRES", "false").lower() == "true"
 
 
 def fetch_ipeds_data(
@@ -179,6 +186,24 @@ def fetch_ipeds_data(
         except OSError as exc:
             logger.warning(f"[{key}] Failed to write cache meta: {exc}")
 
+    def stream_download(source_url: str, dest: IO[bytes]) -> None:
+        # Stream in 1MB chunks so the archive is never held whole in memory
+        with requests.get(source_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                dest.write(chunk)
+        dest.seek(0)
+
+    def read_ipeds_csv(z: zipfile.ZipFile, csv_name: str, key: str) -> pd.DataFrame:
+        # pyarrow parses multi-threaded; fall back to the C engine on malformed rows
+        try:
+            with z.open(csv_name) as csv_file:
+                return pd.read_csv(csv_file, encoding="latin1", engine="pyarrow")
+        except ValueError as exc:
+            logger.warning(f"[{key}] pyarrow CSV parse failed, retrying: {exc}")
+            with z.open(csv_name) as csv_file:
+                return pd.read_csv(csv_file, encoding="latin1")
+
     def build_sources(file_code: str) -> List[str]:
         return [
             f"{base_url}/{file_code}.zip",
@@ -272,9 +297,10 @@ def fetch_ipeds_data(
             for source_url in build_dictionary_sources(file_code):
                 try:
                     logger.info(f"[{file_code}] Downloading dictionary {source_url}")
-                    response = requests.get(source_url, timeout=30)
-                    response.raise_for_status()
-                    dict_zip_path.write_bytes(response.content)
+                    partial_path = dict_zip_path.with_suffix(".zip.part")
+                    with open(partial_path, "wb") as fh:
+                        stream_download(source_url, fh)
+                    partial_path.replace(dict_zip_path)
                     break
                 except requests.exceptions.RequestException as exc:
                     logger.warning(
@@ -337,20 +363,23 @@ def fetch_ipeds_data(
             for source_url in sources:
                 try:
                     logger.info(f"[{key}] Downloading from {source_url}")
-                    response = requests.get(source_url, timeout=30)
-                    response.raise_for_status()
-
-                    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                        file_list = z.namelist()
-                        csv_files = [f for f in file_list if f.lower().endswith(".csv")]
-                        if not csv_files:
-                            logger.warning(f"[{key}] No CSV in archive {source_url}")
-                            continue
-
-                        csv_name = csv_files[0]
-                        logger.info(f"[{key}] Reading {csv_name}")
-                        with z.open(csv_name) as csv_file:
-                            df = pd.read_csv(csv_file, encoding="latin1")
+                    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buf:
+                        stream_download(source_url, buf)
+
+                        with zipfile.ZipFile(buf) as z:
+                            file_list = z.namelist()
+                            csv_files = [
+                                f for f in file_list if f.lower().endswith(".csv")
+                            ]
+                            if not csv_files:
+                                logger.warning(
+                                    f"[{key}] No CSV in archive {source_url}"
+                                )
+                                continue
+
+                            csv_name = csv_files[0]
+                            logger.info(f"[{key}] Reading {csv_name}")
+                            df = read_ipeds_csv(z, csv_name, key)
                             df = normalize_columns(df)
                             save_to_cache(key, df)
                             save_cache_meta(key, file_code)
@@ -430,36 +459,36 @@ def transform_institutions(df: pd.DataFrame) -> pd.DataFrame:
         "F1SYSNAM",  # system name
     ]
     df = ensure_columns(df, columns, "HD")
-    return df[columns].rename(
-        columns={
-            "UNITID": "unitid",
-            "INSTNM": "institution_name",
-            "IALIAS": "institution_alias",
-            "ADDR": "address",
-            "CITY": "city",
-            "STABBR": "state",
-            "ZIP": "zip",
-            "WEBADDR": "website",
-            "SECTOR": "sector",
-            "ICLEVEL": "institutional_level",
-            "CONTROL": "control",
-            "HBCU": "historically_black",
-            "HOSPITAL": "has_hospital",
-            "MEDICAL": "has_medical_school",
-            "TRIBAL": "tribal_college",
-            "LANDGRNT": "landgrant",
-            "CCBASIC": "carnegie_classification",
-            "LOCALE": "locale",
-            "INSTSIZE": "institution_size",
-            "CBSA": "metro_area",
-            "COUNTYNM": "county_name",
-            "OBEREG": "geographic_region",
-            "LATITUDE": "latitude",
-            "LONGITUD": "longitude",
-            "F1SYSTYP": "system_type",
-            "F1SYSNAM": "system_name",
-        }
-    )
+    renames = {
+        "UNITID": "unitid",
+        "INSTNM": "institution_name",
+        "IALIAS": "institution_alias",
+        "ADDR": "address",
+        "CITY": "city",
+        "STABBR": "state",
+        "ZIP": "zip",
+        "WEBADDR": "website",
+        "SECTOR": "sector",
+        "ICLEVEL": "institutional_level",
+        "CONTROL": "control",
+        "HBCU": "historically_black",
+        "HOSPITAL": "has_hospital",
+        "MEDICAL": "has_medical_school",
+        "TRIBAL": "tribal_college",
+        "LANDGRNT": "landgrant",
+        "CCBASIC": "carnegie_classification",
+        "LOCALE": "locale",
+        "INSTSIZE": "institution_size",
+        "CBSA": "metro_area",
+        "COUNTYNM": "county_name",
+        "OBEREG": "geographic_region",
+        "LATITUDE": "latitude",
+        "LONGITUD": "longitude",
+        "F1SYSTYP": "system_type",
+        "F1SYSNAM": "system_name",
+    }
+    # Project and relabel in one step instead of a copy per [] and rename()
+    return df[columns].set_axis([renames[col] for col in columns], axis=1)
 
 
 def transform_enrollment(df: pd.DataFrame, year: int) -> pd.DataFrame:
@@ -487,15 +516,9 @@ def transform_enrollment(df: pd.DataFrame, year: int) -> pd.DataFrame:
     # 2 = Undergraduate total
     # 4 = Graduate total
 
-    # Get totals for each level
-    all_students = df[df["EFALEVEL"] == 1][
-        ["UNITID", "EFTOTLT", "EFTOTLM", "EFTOTLW"]
-    ].copy()
-    undergrad = df[df["EFALEVEL"] == 2][["UNITID", "EFTOTLT"]].copy()
-    graduate = df[df["EFALEVEL"] == 4][["UNITID", "EFTOTLT"]].copy()
-
-    # Merge into single record per institution
-    result = all_students.rename(
+    # Base record and demographics both come from level 1 (all students)
+    all_students = df[df["EFALEVEL"] == 1]
+    result = all_students[["UNITID", "EFTOTLT", "EFTOTLM", "EFTOTLW"]].rename(
         columns={
             "UNITID": "unitid",
             "EFTOTLT": "total_enrollment",
@@ -504,23 +527,19 @@ def transform_enrollment(df: pd.DataFrame, year: int) -> pd.DataFrame:
         }
     )
 
-    # Add undergrad/grad totals
-    if not undergrad.empty:
-        undergrad = undergrad.rename(
-            columns={"UNITID": "unitid", "EFTOTLT": "undergraduate_total"}
-        )
-        result = result.merge(undergrad, on="unitid", how="left")
-
-    if not graduate.empty:
-        graduate = graduate.rename(
-            columns={"UNITID": "unitid", "EFTOTLT": "graduate_total"}
-        )
-        result = result.merge(graduate, on="unitid", how="left")
+    # Undergrad/grad totals in one pivot instead of a filter + merge per level
+    level_totals = (
+        df[df["EFALEVEL"].isin([2, 4])]
+        .drop_duplicates(["UNITID", "EFALEVEL"])
+        .pivot(index="UNITID", columns="EFALEVEL", values="EFTOTLT")
+    )
+    for level, name in ((2, "undergraduate_total"), (4, "graduate_total")):
+        if level in level_totals.columns:
+            result[name] = result["unitid"].map(level_totals[level])
 
     # Add demographic breakdowns from level 1 (all students)
-    demographics = df[df["EFALEVEL"] == 1][
+    demographics = all_students[
         [
-            "UNITID",
             "EFAIANT",  # American Indian/Alaska Native
             "EFASIAT",  # Asian
             "EFBKAAT",  # Black/African American
@@ -531,7 +550,6 @@ def transform_enrollment(df: pd.DataFrame, year: int) -> pd.DataFrame:
         ]
     ].rename(
         columns={
-            "UNITID": "unitid",
             "EFAIANT": "american_indian_total",
             "EFASIAT": "asian_total",
             "EFBKAAT": "black_total",
@@ -542,7 +560,7 @@ def transform_enrollment(df: pd.DataFrame, year: int) -> pd.DataFrame:
         }
     )
 
-    result = result.merge(demographics, on="unitid", how="left")
+    result = pd.concat([result, demographics], axis=1).reset_index(drop=True)
     result["year"] = year
 
     return result
@@ -604,13 +622,13 @@ def transform_staff(df: pd.DataFrame, year: int) -> pd.DataFrame:
     # Get total instructional staff: SISCAT=100, FACSTAT=10, ARANK=0
     instructional = df[
         (df["SISCAT"] == 100) & (df["FACSTAT"] == 10) & (df["ARANK"] == 0)
-    ][["UNITID", "HRTOTLT", "HRTOTLM", "HRTOTLW"]].copy()
+    ]
 
     if instructional.empty:
         print("Warning: No instructional staff data found")
         return pd.DataFrame()
 
-    result = instructional.rename(
+    result = instructional[["UNITID", "HRTOTLT", "HRTOTLM", "HRTOTLW"]].rename(
         columns={
             "UNITID": "unitid",
             "HRTOTLT": "instructional_staff_total",
@@ -619,72 +637,33 @@ def transform_staff(df: pd.DataFrame, year: int) -> pd.DataFrame:
         }
     )
 
-    # Get tenured faculty: SISCAT=200, FACSTAT=20, ARANK=0
-    tenured = df[(df["SISCAT"] == 200) & (df["FACSTAT"] == 20) & (df["ARANK"] == 0)][
-        ["UNITID", "HRTOTLT"]
-    ].rename(columns={"UNITID": "unitid", "HRTOTLT": "tenured_faculty"})
-
-    if not tenured.empty:
-        result = result.merge(tenured, on="unitid", how="left")
-
-    # Get tenure-track: SISCAT=300, FACSTAT=30, ARANK=0
-    tenure_track = df[
-        (df["SISCAT"] == 300) & (df["FACSTAT"] == 30) & (df["ARANK"] == 0)
-    ][["UNITID", "HRTOTLT"]].rename(
-        columns={"UNITID": "unitid", "HRTOTLT": "tenure_track_faculty"}
-    )
-
-    if not tenure_track.empty:
-        result = result.merge(tenure_track, on="unitid", how="left")
-
-    # Get not-on-tenure-track: SISCAT=400, FACSTAT=40, ARANK=0
-    not_tenure_track = df[
-        (df["SISCAT"] == 400) & (df["FACSTAT"] == 40) & (df["ARANK"] == 0)
-    ][["UNITID", "HRTOTLT"]].rename(
-        columns={"UNITID": "unitid", "HRTOTLT": "not_tenure_track_faculty"}
-    )
-
-    if not not_tenure_track.empty:
-        result = result.merge(not_tenure_track, on="unitid", how="left")
-
-    # Faculty by rank from SISCAT=100 (all instructional), varying ARANK
-    professors = df[(df["SISCAT"] == 101) & (df["FACSTAT"] == 10) & (df["ARANK"] == 1)][
-        ["UNITID", "HRTOTLT"]
-    ].rename(columns={"UNITID": "unitid", "HRTOTLT": "professors"})
-
-    associate_profs = df[
-        (df["SISCAT"] == 102) & (df["FACSTAT"] == 10) & (df["ARANK"] == 2)
-    ][["UNITID", "HRTOTLT"]].rename(
-        columns={"UNITID": "unitid", "HRTOTLT": "associate_professors"}
-    )
-
-    assistant_profs = df[
-        (df["SISCAT"] == 103) & (df["FACSTAT"] == 10) & (df["ARANK"] == 3)
-    ][["UNITID", "HRTOTLT"]].rename(
-        columns={"UNITID": "unitid", "HRTOTLT": "assistant_professors"}
-    )
+    # (SISCAT, FACSTAT, ARANK) -> output column
+    breakdowns = [
+        ((200, 20, 0), "tenured_faculty"),
+        ((300, 30, 0), "tenure_track_faculty"),
+        ((400, 40, 0), "not_tenure_track_faculty"),
+        # Faculty by rank from SISCAT=100 (all instructional), varying ARANK
+        ((101, 10, 1), "professors"),
+        ((102, 10, 2), "associate_professors"),
+        ((103, 10, 3), "assistant_professors"),
+        ((104, 10, 4), "instructors"),
+    ]
 
-    instructors = df[
-        (df["SISCAT"] == 104) & (df["FACSTAT"] == 10) & (df["ARANK"] == 4)
-    ][["UNITID", "HRTOTLT"]].rename(
-        columns={"UNITID": "unitid", "HRTOTLT": "instructors"}
+    # One pivot of HRTOTLT over all breakdown cells instead of a filter + merge each
+    category = ["SISCAT", "FACSTAT", "ARANK"]
+    wanted = pd.MultiIndex.from_frame(df[category]).isin([key for key, _ in breakdowns])
+    cells = (
+        df[wanted]
+        .drop_duplicates(["UNITID", *category])
+        .pivot(index="UNITID", columns=category, values="HRTOTLT")
     )
-
-    if not professors.empty:
-        result = result.merge(professors, on="unitid", how="left")
-    if not associate_profs.empty:
-        result = result.merge(associate_profs, on="unitid", how="left")
-    if not assistant_profs.empty:
-        result = result.merge(assistant_profs, on="unitid", how="left")
-    if not instructors.empty:
-        result = result.merge(instructors, on="unitid", how="left")
+    for key, name in breakdowns:
+        if key in cells.columns:
+            result[name] = result["unitid"].map(cells[key])
 
     # Demographics from SISCAT=100, FACSTAT=10, ARANK=0
-    demographics = df[
-        (df["SISCAT"] == 100) & (df["FACSTAT"] == 10) & (df["ARANK"] == 0)
-    ][
+    demographics = instructional[
         [
-            "UNITID",
             "HRAIANT",
             "HRASIAT",
             "HRBKAAT",
@@ -695,7 +674,6 @@ def transform_staff(df: pd.DataFrame, year: int) -> pd.DataFrame:
         ]
     ].rename(
         columns={
-            "UNITID": "unitid",
             "HRAIANT": "american_indian_faculty",
             "HRASIAT": "asian_faculty",
             "HRBKAAT": "black_faculty",
@@ -706,9 +684,7 @@ def transform_staff(df: pd.DataFrame, year: int) -> pd.DataFrame:
         }
     )
 
-    if not demographics.empty:
-        result = result.merge(demographics, on="unitid", how="left")
-
+    result = pd.concat([result, demographics], axis=1).reset_index(drop=True)
     result["year"] = year
 
     return result
@@ -721,195 +697,194 @@ def transform_finance(df: pd.DataFrame, year: int) -> pd.DataFrame:
     # Get all non-X columns (X prefix = imputation flags, skip those)
     finance_columns = [col for col in df.columns if not col.startswith("X")]
 
+    renames = {
+        "UNITID": "unitid",
+        # ========== SECTION A: ASSETS & LIABILITIES ==========
+        "F2A01": "total_assets",
+        "F2A19": "total_liabilities",
+        "F2A20": "net_assets",
+        "F2A02": "current_assets",
+        "F2A03": "long_term_investments",
+        "F2A03A": "land_buildings_equipment_net",
+        "F2A04": "property_plant_equipment",
+        "F2A05": "accumulated_depreciation",
+        "F2A05A": "intangible_assets_net",
+        "F2A05B": "other_noncurrent_assets",
+        "F2A06": "deferred_outflows",
+        "F2A11": "current_liabilities",
+        "F2A12": "long_term_debt_current",
+        "F2A13": "other_current_liabilities",
+        "F2A15": "noncurrent_liabilities",
+        "F2A16": "long_term_debt_noncurrent",
+        "F2A17": "other_noncurrent_liabilities",
+        "F2A18": "deferred_inflows",
+        # ========== SECTION B: SCHOLARSHIPS ==========
+        "F2B01": "federal_grants_scholarships",
+        "F2B02": "state_local_grants_scholarships",
+        "F2B03": "institutional_grants_scholarships",
+        "F2B04": "total_discounts_allowances",
+        "F2B05": "total_scholarships_fellowships",
+        "F2B06": "net_scholarships_fellowships",
+        "F2B07": "allowances_tuition_fees",
+        # ========== SECTION C: REVENUES ==========
+        "F2C01": "total_revenues",
+        "F2C02": "total_operating_revenues",
+        "F2C03": "total_nonoperating_revenues",
+        "F2C04": "other_revenues_additions",
+        "F2C05": "tuition_fees_gross",
+        "F2C06": "tuition_fees_allowances",
+        "F2C07": "tuition_fees_net",
+        "F2C08": "federal_appropriations",
+        "F2C09": "state_appropriations",
+        "F2C10": "local_appropriations",
+        # Revenue details
+        "F2C12": "federal_grants_contracts",
+        "F2C121": "federal_operating_grants",
+        "F2C122": "federal_nonoperating_grants",
+        "F2C13": "state_grants_contracts",
+        "F2C131": "state_operating_grants",
+        "F2C132": "state_nonoperating_grants",
+        "F2C14": "local_grants_contracts",
+        "F2C141": "local_operating_grants",
+        "F2C142": "local_nonoperating_grants",
+        "F2C15": "private_gifts_grants_contracts",
+        "F2C151": "private_operating_grants",
+        "F2C152": "private_nonoperating_grants",
+        "F2C16": "investment_return",
+        "F2C161": "investment_income_operating",
+        "F2C162": "investment_income_nonoperating",
+        "F2C17": "other_revenues",
+        "F2C171": "sales_services_auxiliary",
+        "F2C172": "sales_services_hospitals",
+        # ========== SECTION D: FUNCTIONAL EXPENSES ==========
+        "F2D01": "total_expenses",
+        "F2D012": "total_operating_expenses",
+        "F2D013": "total_nonoperating_expenses",
+        "F2D014": "other_expenses_deductions",
+        "F2D02": "instruction_total",
+        "F2D022": "instruction_salaries",
+        "F2D023": "instruction_benefits",
+        "F2D024": "instruction_operations",
+        "F2D03": "research_total",
+        "F2D032": "research_salaries",
+        "F2D033": "research_benefits",
+        "F2D034": "research_operations",
+        "F2D04": "public_service_total",
+        "F2D042": "public_service_salaries",
+        "F2D043": "public_service_benefits",
+        "F2D044": "public_service_operations",
+        "F2D05": "academic_support_total",
+        "F2D052": "academic_support_salaries",
+        "F2D053": "academic_support_benefits",
+        "F2D054": "academic_support_operations",
+        "F2D06": "student_services_total",
+        "F2D062": "student_services_salaries",
+        "F2D063": "student_services_benefits",
+        "F2D064": "student_services_operations",
+        "F2D07": "institutional_support_total",
+        "F2D072": "institutional_support_salaries",
+        "F2D073": "institutional_support_benefits",
+        "F2D074": "institutional_support_operations",
+        "F2D08": "auxiliary_enterprises_total",
+        "F2D082": "auxiliary_salaries",
+        "F2D083": "auxiliary_benefits",
+        "F2D084": "auxiliary_operations",
+        "F2D08A": "hospital_services_total",
+        "F2D082A": "hospital_salaries",
+        "F2D083A": "hospital_benefits",
+        "F2D084A": "hospital_operations",
+        "F2D08B": "independent_operations_total",
+        "F2D082B": "independent_operations_salaries",
+        "F2D083B": "independent_operations_benefits",
+        "F2D084B": "independent_operations_operations",
+        "F2D09": "other_core_expenses_total",
+        "F2D092": "other_core_salaries",
+        "F2D093": "other_core_benefits",
+        "F2D094": "other_core_operations",
+        # Non-core expenses
+        "F2D10": "depreciation",
+        "F2D102": "depreciation_buildings",
+        "F2D103": "depreciation_equipment",
+        "F2D104": "depreciation_other",
+        "F2D11": "interest_expense",
+        "F2D112": "interest_debt_financing",
+        "F2D12": "other_natural_expenses",
+        "F2D122": "other_natural_expenses_detail",
+        # Specific function details
+        "F2D13": "total_salaries_wages",
+        "F2D132": "total_benefits",
+        "F2D14": "operation_maintenance_plant",
+        "F2D142": "operation_maintenance_salaries",
+        "F2D143": "operation_maintenance_benefits",
+        "F2D144": "operation_maintenance_operations",
+        "F2D15": "net_grant_aid_students",
+        "F2D152": "scholarships_fellowships_net",
+        "F2D153": "discounts_allowances",
+        "F2D154": "other_student_aid",
+        "F2D16": "total_other_expenses",
+        "F2D162": "other_expenses_salaries",
+        "F2D163": "other_expenses_benefits",
+        "F2D164": "other_expenses_operations",
+        "F2D17": "total_net_other_gains_losses",
+        "F2D172": "gains_losses_investments",
+        "F2D173": "gains_losses_endowment",
+        "F2D174": "other_nonoperating_gains_losses",
+        "F2D18": "total_other_changes",
+        "F2D182": "capital_appropriations",
+        "F2D183": "capital_grants_gifts",
+        "F2D184": "additions_permanent_endowments",
+        # ========== SECTION E: NATURAL CLASSIFICATION ==========
+        "F2E011": "instruction_salaries_wages",
+        "F2E012": "instruction_employee_benefits",
+        "F2E021": "research_salaries_wages",
+        "F2E022": "research_employee_benefits",
+        "F2E031": "public_service_salaries_wages",
+        "F2E032": "public_service_employee_benefits",
+        "F2E041": "academic_support_salaries_wages",
+        "F2E042": "academic_support_employee_benefits",
+        "F2E051": "student_services_salaries_wages",
+        "F2E052": "student_services_employee_benefits",
+        "F2E061": "institutional_support_salaries_wages",
+        "F2E062": "institutional_support_employee_benefits",
+        "F2E071": "auxiliary_salaries_wages",
+        "F2E072": "auxiliary_employee_benefits",
+        "F2E081": "net_grant_aid_salaries",
+        "F2E091": "hospital_salaries_wages",
+        "F2E092": "hospital_employee_benefits",
+        "F2E101": "independent_operations_salaries_wages",
+        "F2E102": "independent_operations_employee_benefits",
+        "F2E121": "other_expenses_salaries_wages",
+        "F2E122": "other_expenses_employee_benefits",
+        # Total natural expenses
+        "F2E131": "depreciation_total",
+        "F2E132": "interest_total",
+        "F2E133": "operation_maintenance_total",
+        "F2E134": "all_other_expenses",
+        "F2E135": "total_salaries_wages_natural",
+        "F2E136": "total_employee_benefits_natural",
+        "F2E137": "total_all_other_natural",
+        # ========== SECTION H: ENDOWMENT ==========
+        "F2FHA": "endowment_flag",
+        "F2H01": "endowment_assets_boy",
+        "F2H02": "endowment_assets_eoy",
+        "F2H03": "total_endowment_additions",
+        "F2H03A": "endowment_gifts",
+        "F2H03B": "endowment_investment_gains",
+        "F2H03C": "endowment_withdrawals",
+        "F2H03D": "endowment_other_changes",
+        # ========== SECTION I: PENSION ==========
+        "F2I01": "pension_expense",
+        "F2I02": "opeb_expense",
+        "F2I03": "pension_plan_fiduciary_net_position",
+        "F2I04": "opeb_plan_fiduciary_net_position",
+        "F2I05": "pension_net_liability",
+        "F2I06": "opeb_net_liability",
+        "F2I07": "other_postemployment_benefits",
+    }
     return (
         df[finance_columns]
+        .set_axis([renames.get(col, col) for col in finance_columns], axis=1)
         .assign(year=year)
-        .rename(
-            columns={
-                "UNITID": "unitid",
-                # ========== SECTION A: ASSETS & LIABILITIES ==========
-                "F2A01": "total_assets",
-                "F2A19": "total_liabilities",
-                "F2A20": "net_assets",
-                "F2A02": "current_assets",
-                "F2A03": "long_term_investments",
-                "F2A03A": "land_buildings_equipment_net",
-                "F2A04": "property_plant_equipment",
-                "F2A05": "accumulated_depreciation",
-                "F2A05A": "intangible_assets_net",
-                "F2A05B": "other_noncurrent_assets",
-                "F2A06": "deferred_outflows",
-                "F2A11": "current_liabilities",
-                "F2A12": "long_term_debt_current",
-                "F2A13": "other_current_liabilities",
-                "F2A15": "noncurrent_liabilities",
-                "F2A16": "long_term_debt_noncurrent",
-                "F2A17": "other_noncurrent_liabilities",
-                "F2A18": "deferred_inflows",
-                # ========== SECTION B: SCHOLARSHIPS ==========
-                "F2B01": "federal_grants_scholarships",
-                "F2B02": "state_local_grants_scholarships",
-                "F2B03": "institutional_grants_scholarships",
-                "F2B04": "total_discounts_allowances",
-                "F2B05": "total_scholarships_fellowships",
-                "F2B06": "net_scholarships_fellowships",
-                "F2B07": "allowances_tuition_fees",
-                # ========== SECTION C: REVENUES ==========
-                "F2C01": "total_revenues",
-                "F2C02": "total_operating_revenues",
-                "F2C03": "total_nonoperating_revenues",
-                "F2C04": "other_revenues_additions",
-                "F2C05": "tuition_fees_gross",
-                "F2C06": "tuition_fees_allowances",
-                "F2C07": "tuition_fees_net",
-                "F2C08": "federal_appropriations",
-                "F2C09": "state_appropriations",
-                "F2C10": "local_appropriations",
-                # Revenue details
-                "F2C12": "federal_grants_contracts",
-                "F2C121": "federal_operating_grants",
-                "F2C122": "federal_nonoperating_grants",
-                "F2C13": "state_grants_contracts",
-                "F2C131": "state_operating_grants",
-                "F2C132": "state_nonoperating_grants",
-                "F2C14": "local_grants_contracts",
-                "F2C141": "local_operating_grants",
-                "F2C142": "local_nonoperating_grants",
-                "F2C15": "private_gifts_grants_contracts",
-                "F2C151": "private_operating_grants",
-                "F2C152": "private_nonoperating_grants",
-                "F2C16": "investment_return",
-                "F2C161": "investment_income_operating",
-                "F2C162": "investment_income_nonoperating",
-                "F2C17": "other_revenues",
-                "F2C171": "sales_services_auxiliary",
-                "F2C172": "sales_services_hospitals",
-                # ========== SECTION D: FUNCTIONAL EXPENSES ==========
-                "F2D01": "total_expenses",
-                "F2D012": "total_operating_expenses",
-                "F2D013": "total_nonoperating_expenses",
-                "F2D014": "other_expenses_deductions",
-                "F2D02": "instruction_total",
-                "F2D022": "instruction_salaries",
-                "F2D023": "instruction_benefits",
-                "F2D024": "instruction_operations",
-                "F2D03": "research_total",
-                "F2D032": "research_salaries",
-                "F2D033": "research_benefits",
-                "F2D034": "research_operations",
-                "F2D04": "public_service_total",
-                "F2D042": "public_service_salaries",
-                "F2D043": "public_service_benefits",
-                "F2D044": "public_service_operations",
-                "F2D05": "academic_support_total",
-                "F2D052": "academic_support_salaries",
-                "F2D053": "academic_support_benefits",
-                "F2D054": "academic_support_operations",
-                "F2D06": "student_services_total",
-                "F2D062": "student_services_salaries",
-                "F2D063": "student_services_benefits",
-                "F2D064": "student_services_operations",
-                "F2D07": "institutional_support_total",
-                "F2D072": "institutional_support_salaries",
-                "F2D073": "institutional_support_benefits",
-                "F2D074": "institutional_support_operations",
-                "F2D08": "auxiliary_enterprises_total",
-                "F2D082": "auxiliary_salaries",
-                "F2D083": "auxiliary_benefits",
-                "F2D084": "auxiliary_operations",
-                "F2D08A": "hospital_services_total",
-                "F2D082A": "hospital_salaries",
-                "F2D083A": "hospital_benefits",
-                "F2D084A": "hospital_operations",
-                "F2D08B": "independent_operations_total",
-                "F2D082B": "independent_operations_salaries",
-                "F2D083B": "independent_operations_benefits",
-                "F2D084B": "independent_operations_operations",
-                "F2D09": "other_core_expenses_total",
-                "F2D092": "other_core_salaries",
-                "F2D093": "other_core_benefits",
-                "F2D094": "other_core_operations",
-                # Non-core expenses
-                "F2D10": "depreciation",
-                "F2D102": "depreciation_buildings",
-                "F2D103": "depreciation_equipment",
-                "F2D104": "depreciation_other",
-                "F2D11": "interest_expense",
-                "F2D112": "interest_debt_financing",
-                "F2D12": "other_natural_expenses",
-                "F2D122": "other_natural_expenses_detail",
-                # Specific function details
-                "F2D13": "total_salaries_wages",
-                "F2D132": "total_benefits",
-                "F2D14": "operation_maintenance_plant",
-                "F2D142": "operation_maintenance_salaries",
-                "F2D143": "operation_maintenance_benefits",
-                "F2D144": "operation_maintenance_operations",
-                "F2D15": "net_grant_aid_students",
-                "F2D152": "scholarships_fellowships_net",
-                "F2D153": "discounts_allowances",
-                "F2D154": "other_student_aid",
-                "F2D16": "total_other_expenses",
-                "F2D162": "other_expenses_salaries",
-                "F2D163": "other_expenses_benefits",
-                "F2D164": "other_expenses_operations",
-                "F2D17": "total_net_other_gains_losses",
-                "F2D172": "gains_losses_investments",
-                "F2D173": "gains_losses_endowment",
-                "F2D174": "other_nonoperating_gains_losses",
-                "F2D18": "total_other_changes",
-                "F2D182": "capital_appropriations",
-                "F2D183": "capital_grants_gifts",
-                "F2D184": "additions_permanent_endowments",
-                # ========== SECTION E: NATURAL CLASSIFICATION ==========
-                "F2E011": "instruction_salaries_wages",
-                "F2E012": "instruction_employee_benefits",
-                "F2E021": "research_salaries_wages",
-                "F2E022": "research_employee_benefits",
-                "F2E031": "public_service_salaries_wages",
-                "F2E032": "public_service_employee_benefits",
-                "F2E041": "academic_support_salaries_wages",
-                "F2E042": "academic_support_employee_benefits",
-                "F2E051": "student_services_salaries_wages",
-                "F2E052": "student_services_employee_benefits",
-                "F2E061": "institutional_support_salaries_wages",
-                "F2E062": "institutional_support_employee_benefits",
-                "F2E071": "auxiliary_salaries_wages",
-                "F2E072": "auxiliary_employee_benefits",
-                "F2E081": "net_grant_aid_salaries",
-                "F2E091": "hospital_salaries_wages",
-                "F2E092": "hospital_employee_benefits",
-                "F2E101": "independent_operations_salaries_wages",
-                "F2E102": "independent_operations_employee_benefits",
-                "F2E121": "other_expenses_salaries_wages",
-                "F2E122": "other_expenses_employee_benefits",
-                # Total natural expenses
-                "F2E131": "depreciation_total",
-                "F2E132": "interest_total",
-                "F2E133": "operation_maintenance_total",
-                "F2E134": "all_other_expenses",
-                "F2E135": "total_salaries_wages_natural",
-                "F2E136": "total_employee_benefits_natural",
-                "F2E137": "total_all_other_natural",
-                # ========== SECTION H: ENDOWMENT ==========
-                "F2FHA": "endowment_flag",
-                "F2H01": "endowment_assets_boy",
-                "F2H02": "endowment_assets_eoy",
-                "F2H03": "total_endowment_additions",
-                "F2H03A": "endowment_gifts",
-                "F2H03B": "endowment_investment_gains",
-                "F2H03C": "endowment_withdrawals",
-                "F2H03D": "endowment_other_changes",
-                # ========== SECTION I: PENSION ==========
-                "F2I01": "pension_expense",
-                "F2I02": "opeb_expense",
-                "F2I03": "pension_plan_fiduciary_net_position",
-                "F2I04": "opeb_plan_fiduciary_net_position",
-                "F2I05": "pension_net_liability",
-                "F2I06": "opeb_net_liability",
-                "F2I07": "other_postemployment_benefits",
-            }
-        )
     )
 
 
@@ -917,20 +892,19 @@ def transform_completions(df: pd.DataFrame, year: int) -> pd.DataFrame:
     print(f"List of columns in the completion table: {df.columns.values}")
     """Transform C_A (Completions) data to match schema"""
     df = ensure_columns(df, ["UNITID", "AWLEVEL"], "C_A")
-    # Aggregate by degree level
-    grouped = df.groupby(["UNITID", "AWLEVEL"]).size().reset_index(name="count")
-
-    pivoted = grouped.pivot(index="UNITID", columns="AWLEVEL", values="count").fillna(0)
+    # Count awards per (institution, degree level) in one pass
+    pivoted = pd.crosstab(df["UNITID"], df["AWLEVEL"])
+    levels = pivoted.reindex(columns=[3, 5, 7, 17, 19], fill_value=0)
 
     return (
         pivoted.assign(
             year=year,
             total_degrees=pivoted.sum(axis=1),
-            associates_degrees=pivoted.get(3, 0),  # Associate's degree
-            bachelors_degrees=pivoted.get(5, 0),  # Bachelor's degree
-            masters_degrees=pivoted.get(7, 0),  # Master's degree
-            doctoral_degrees=pivoted.get(17, 0)
-            + pivoted.get(19, 0),  # Research + Professional doctorate
+            associates_degrees=levels[3],  # Associate's degree
+            bachelors_degrees=levels[5],  # Bachelor's degree
+            masters_degrees=levels[7],  # Master's degree
+            doctoral_degrees=levels[17]
+            + levels[19],  # Research + Professional doctorate
         )
         .reset_index()
         .rename(columns={"UNITID": "unitid"})
@@ -950,22 +924,21 @@ def transform_admissions(df: pd.DataFrame, year: int) -> pd.DataFrame:
         "ACTCM75",  # ACT Composite 75th
     ]
     df = ensure_columns(df, columns, "ADM")
+    renames = {
+        "UNITID": "unitid",
+        "APPLCN": "applicants",
+        "ADMSSN": "admitted",
+        "ENRLT": "enrolled",
+        "ACTCM25": "act_25th_percentile",
+        "ACTCM75": "act_75th_percentile",
+    }
     return (
         df[columns]
+        .set_axis([renames.get(col, col) for col in columns], axis=1)
         .assign(
             year=year,
-            acceptance_rate=lambda x: (x["ADMSSN"] / x["APPLCN"] * 100).round(2),
-            yield_rate=lambda x: (x["ENRLT"] / x["ADMSSN"] * 100).round(2),
-        )
-        .rename(
-            columns={
-                "UNITID": "unitid",
-                "APPLCN": "applicants",
-                "ADMSSN": "admitted",
-                "ENRLT": "enrolled",
-                "ACTCM25": "act_25th_percentile",
-                "ACTCM75": "act_75th_percentile",
-            }
+            acceptance_rate=lambda x: (x["admitted"] / x["applicants"] * 100).round(2),
+            yield_rate=lambda x: (x["enrolled"] / x["admitted"] * 100).round(2),
         )
     )
 
@@ -976,6 +949,38 @@ def main():
         processDataForYear(index)
 
 
+def connect_postgres():
+    import psycopg2
+
+    return psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=int(os.getenv("POSTGRES_PORT", "5432")),
+        dbname=os.getenv("POSTGRES_DB", "rank-nsf-linker"),
+        user=os.getenv("POSTGRES_USER", "postgres"),
+        password=os.getenv("POSTGRES_PASSWORD", "postgres"),
+    )
+
+
+def copy_to_postgres(conn, table: str, columns: List[str], csv_text: str) -> None:
+    """Bulk-load an exported CSV (with header) into `table` via COPY FROM STDIN"""
+    from psycopg2 import sql
+
+    statement = sql.SQL(
+        "COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)"
+    ).format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.Identifier(str(col)) for col in columns),
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(statement, io.StringIO(csv_text))
+        conn.commit()
+        print(f"✓ Copied into {table}")
+    except Exception as exc:
+        conn.rollback()
+        print(f"⚠️ COPY into {table} failed: {exc}")
+
+
 def processDataForYear(year: int) -> None:
     print("Fetching IPEDS data...")
     data, column_maps = fetch_ipeds_data(year)
@@ -1048,6 +1053,8 @@ def processDataForYear(year: int) -> None:
     os.makedirs(data_path, exist_ok=True)
     os.makedirs(columns_path, exist_ok=True)
 
+    conn = connect_postgres() if LOAD_POSTGRES else None
+
     # 2. Process each dataframe
     for key, df in data.items():
         if df is None:
@@ -1062,11 +1069,17 @@ def processDataForYear(year: int) -> None:
             filename = f"ipeds_{key}.csv"
             transformed = passthrough(df)
 
-        # 4. Save CSV to year folder
+        # 4. Save CSV to year folder (serialized once, reused for COPY)
         csv_path = Path(data_path).joinpath(filename)
-        transformed.to_csv(csv_path, index=False)
+        csv_text = transformed.to_csv(index=False)
+        csv_path.write_text(csv_text, encoding="utf-8")
         print(f"✓ Saved {len(transformed)} records to {filename}")
 
+        if conn is not None and not transformed.empty:
+            copy_to_postgres(
+                conn, Path(filename).stem, list(transformed.columns), csv_text
+            )
+
         # 5. Save column mappings for non-transformed data
         if key not in transforms:
             mapping = column_maps.get(key)
@@ -1078,8 +1091,12 @@ def processDataForYear(year: int) -> None:
                 print(f"✓ Saved column map to {column_path}")
 
     print("\n✓ All data exported to CSV files")
-    print("Import to Postgres with:")
-    print("  psql -d nsf_scraper -f import_ipeds.sql")
+    if conn is not None:
+        conn.close()
+    else:
+        print("Import to Postgres with:")
+        print("  psql -d nsf_scraper -f import_ipeds.sql")
+        print("  (or rerun with IPEDS_LOAD_POSTGRES=true to COPY directly)")
 
 
 # ========== TRANSFORMATION FUNCTIONS ==========